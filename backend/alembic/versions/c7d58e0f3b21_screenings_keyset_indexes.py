@@ -0,0 +1,51 @@
+"""screenings keyset indexes
+
+Revision ID: c7d58e0f3b21
+Revises: b41c9d2e7a10
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "c7d58e0f3b21"
+down_revision: Union[str, Sequence[str], None] = "b41c9d2e7a10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY не блокирует запись в screenings, но требует autocommit
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_screenings_user_created",
+            "screenings",
+            ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_screenings_created",
+            "screenings",
+            [sa.text("created_at DESC"), sa.text("id DESC")],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_screenings_created",
+            table_name="screenings",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_screenings_user_created",
+            table_name="screenings",
+            postgresql_concurrently=True,
+        )
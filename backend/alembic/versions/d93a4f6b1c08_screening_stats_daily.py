@@ -0,0 +1,50 @@
+"""screening stats daily
+
+Revision ID: d93a4f6b1c08
+Revises: c7d58e0f3b21
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "d93a4f6b1c08"
+down_revision: Union[str, Sequence[str], None] = "c7d58e0f3b21"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "screening_stats_daily",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("dimension", sa.Text(), nullable=False),
+        sa.Column("risk", sa.Text(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("day", "dimension", "risk"),
+    )
+    # Заполнение по уже существующим обследованиям (то же, что backfill_stats.py)
+    op.execute("""
+        INSERT INTO screening_stats_daily (day, dimension, risk, count)
+        SELECT date(created_at), 'overall', overall_risk, count(*)
+        FROM screenings WHERE created_at IS NOT NULL
+        GROUP BY date(created_at), overall_risk
+        UNION ALL
+        SELECT date(created_at), 'frontal', frontal_risk, count(*)
+        FROM screenings WHERE created_at IS NOT NULL
+        GROUP BY date(created_at), frontal_risk
+        UNION ALL
+        SELECT date(created_at), 'sagittal', sagittal_risk, count(*)
+        FROM screenings WHERE created_at IS NOT NULL
+        GROUP BY date(created_at), sagittal_risk
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("screening_stats_daily")
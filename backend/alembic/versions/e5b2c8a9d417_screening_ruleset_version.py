@@ -0,0 +1,32 @@
+"""screening ruleset version
+
+Revision ID: e5b2c8a9d417
+Revises: d93a4f6b1c08
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "e5b2c8a9d417"
+down_revision: Union[str, Sequence[str], None] = "d93a4f6b1c08"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Все существующие записи оценены по порогам, ставшим набором "1"
+    op.add_column(
+        "screenings",
+        sa.Column("ruleset_version", sa.Text(), server_default="1", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("screenings", "ruleset_version")
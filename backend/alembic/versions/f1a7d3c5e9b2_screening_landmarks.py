@@ -0,0 +1,41 @@
+"""screening landmarks
+
+Revision ID: f1a7d3c5e9b2
+Revises: e5b2c8a9d417
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "f1a7d3c5e9b2"
+down_revision: Union[str, Sequence[str], None] = "e5b2c8a9d417"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "screening_landmarks",
+        sa.Column("screening_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("view", sa.Text(), nullable=False),
+        sa.Column("frames", sa.Integer(), nullable=False),
+        sa.Column("dtype", sa.Text(), nullable=False),
+        sa.Column("aspect", sa.Float(), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["screening_id"], ["screenings.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("screening_id", "view"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("screening_landmarks")
@@ -1,105 +1,514 @@
+import os
+import tempfile
+import time
+
 import cv2
 import numpy as np
-from mediapipe.python.solutions import pose as mp_pose
 
-Pose = mp_pose.Pose
-PoseLandmark = mp_pose.PoseLandmark
+from app import metrics, pose_engine, risk
+from app.imaging import read_image_size, sniff_format
+
+# Меняется при любом изменении логики анализа — старые записи кэша
+# результатов перестают совпадать по ключу
+ANALYSIS_VERSION = "4"
 
 # -------------------------
-# MediaPipe Pose (WARMUP)
+# MediaPipe Pose (POOLED)
 # -------------------------
 
-# Прогрев модели (ускоряет первый запрос)
-_pose_warmup = mp_pose.Pose(
-    static_image_mode=True,
-    model_complexity=0,
-    enable_segmentation=False,
-    min_detection_confidence=0.5,
+# Модели MediaPipe не потокобезопасны: каждый вызов берёт свой экземпляр
+# из пула pose_engine и возвращает его после process()
+BACK_MODEL_COMPLEXITY = 0
+BACK_MIN_CONFIDENCE = 0.5
+
+SIDE_MODEL_COMPLEXITY = 1
+SIDE_MIN_CONFIDENCE = 0.5
+
+# -------------------------
+# COMPLEXITY CASCADE
+# -------------------------
+# Вместо фиксированной модели на ракурс фото сначала идёт в самую быструю
+# модель, и только при низкой уверенности — в следующие по списку.
+# Уверенность — средняя visibility тех landmarks, по которым считаются
+# метрики ракурса. Видео (режим трекинга) всегда идёт на фиксированной модели
+POSE_CASCADE = os.getenv("POSE_CASCADE", "0") == "1"
+POSE_CASCADE_TIERS = tuple(
+    int(c) for c in os.getenv("POSE_CASCADE_TIERS", "0,1,2").split(",")
 )
+POSE_CASCADE_MIN_VISIBILITY = float(os.getenv("POSE_CASCADE_MIN_VISIBILITY", "0.6"))
+
+_KEY_LANDMARKS = {view: metrics.landmarks_used(view) for view in ("back", "side")}
+
+# Варианты моделей из пула, которые прогреваются при старте API
+POSE_VARIANTS = [
+    (BACK_MODEL_COMPLEXITY, BACK_MIN_CONFIDENCE),
+    (SIDE_MODEL_COMPLEXITY, SIDE_MIN_CONFIDENCE),
+]
+if POSE_CASCADE:
+    # Все ступени заранее: эскалация не должна ждать загрузки модели
+    POSE_VARIANTS = list(
+        dict.fromkeys(
+            POSE_VARIANTS
+            + [(c, BACK_MIN_CONFIDENCE) for c in POSE_CASCADE_TIERS]
+            + [(c, SIDE_MIN_CONFIDENCE) for c in POSE_CASCADE_TIERS]
+        )
+    )
+
+
+# -------------------------
+# PREPROCESSING
+# -------------------------
+
+# Максимальная длина стороны изображения, подаваемого в MediaPipe.
+# Модель всё равно работает на 256 px, большие фото только тратят память и CPU.
+ANALYSIS_MAX_SIDE = int(os.getenv("ANALYSIS_MAX_SIDE", "1024"))
+
+# Уменьшение при декодировании (для JPEG — прямо в DCT, без полного декода)
+_REDUCED_DECODE_FLAGS = [
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+]
+
+
+# -------------------------
+# PERSON ROI
+# -------------------------
+# На общих снимках класса ребёнок занимает малую часть кадра. Быстрый
+# проход по уменьшенной копии находит человека, а в модель уходит вырез
+# вокруг него из изображения большего разрешения. Landmarks затем
+# переводятся обратно в нормированные координаты всего фото
+POSE_ROI = os.getenv("POSE_ROI", "0") == "1"
+
+# Длинная сторона копии для предварительного прохода
+POSE_ROI_PREPASS_SIDE = int(os.getenv("POSE_ROI_PREPASS_SIDE", "256"))
+
+# Предел длинной стороны изображения, из которого берётся вырез; реальное
+# разрешение подбирается так, чтобы вырез был не меньше ANALYSIS_MAX_SIDE
+POSE_ROI_SOURCE_SIDE = int(os.getenv("POSE_ROI_SOURCE_SIDE", "4096"))
+
+# Поле вокруг найденной позы — доля её ширины / высоты с каждой стороны
+POSE_ROI_MARGIN = float(os.getenv("POSE_ROI_MARGIN", "0.25"))
+
+# Если вырез занимает большую часть кадра, он ничего не даёт
+POSE_ROI_MAX_AREA = float(os.getenv("POSE_ROI_MAX_AREA", "0.5"))
+
+# Предварительный проход — всегда самая лёгкая модель
+POSE_ROI_COMPLEXITY = 0
+
+if POSE_ROI:
+    POSE_VARIANTS = list(
+        dict.fromkeys(
+            POSE_VARIANTS
+            + [
+                (POSE_ROI_COMPLEXITY, BACK_MIN_CONFIDENCE),
+                (POSE_ROI_COMPLEXITY, SIDE_MIN_CONFIDENCE),
+            ]
+        )
+    )
 
 
-def _decode_image(image_bytes: bytes):
+VIEW_LABELS = {
+    "back": "вид со спины",
+    "side": "вид сбоку",
+}
+
+
+class PoseNotFound(ValueError):
+    pass
+
+
+def cache_params(view: str) -> str:
+    # Всё, от чего зависит результат анализа, кроме самих байтов изображения
+    if view == "back":
+        model = (BACK_MODEL_COMPLEXITY, BACK_MIN_CONFIDENCE)
+    else:
+        model = (SIDE_MODEL_COMPLEXITY, SIDE_MIN_CONFIDENCE)
+    if POSE_CASCADE:
+        tiers = "-".join(map(str, POSE_CASCADE_TIERS))
+        model = (f"cascade{tiers}@{POSE_CASCADE_MIN_VISIBILITY}", model[1])
+    roi = (
+        f":roi{POSE_ROI_PREPASS_SIDE}-{POSE_ROI_SOURCE_SIDE}"
+        f"-{POSE_ROI_MARGIN}-{POSE_ROI_MAX_AREA}"
+        if POSE_ROI
+        else ""
+    )
+    # Версия правил риска: пояснения в результате зависят от её порогов
+    return (
+        f"{ANALYSIS_VERSION}:{risk.ACTIVE.version}:"
+        f"{model[0]}:{model[1]}:{ANALYSIS_MAX_SIDE}{roi}"
+    )
+
+
+def _ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def _fit(img, max_side: int):
+    # Уменьшение до max_side по длинной стороне; меньшие изображения — как есть
+    height, width = img.shape[:2]
+    if not max_side or max(height, width) <= max_side:
+        return img
+    scale = max_side / max(height, width)
+    return cv2.resize(
+        img,
+        (max(1, round(width * scale)), max(1, round(height * scale))),
+        interpolation=cv2.INTER_AREA,
+    )
+
+
+def _decode_image(
+    image_bytes: bytes,
+    max_side: int = ANALYSIS_MAX_SIDE,
+    stats=None,
+    resize=True,
+    max_decoded: int = None,
+):
+    # resize=False — только уменьшение при декодировании, без точной подгонки;
+    # max_decoded — жёсткий предел длинной стороны декодированного
+    stats = {} if stats is None else stats
+
+    start = time.perf_counter()
+    size = read_image_size(image_bytes)
+
+    flag, factor = cv2.IMREAD_COLOR, 1
+    if size and max_side:
+        longest = max(size)
+        # Самый слабый коэффициент, при котором укладываемся в max_decoded
+        # (декодер округляет размер вверх); 1 — фото и так не больше предела
+        least = 1
+        if max_decoded:
+            least = next(
+                (f for f in (1, 2, 4, 8) if -(-longest // f) <= max_decoded), 8
+            )
+        for f, reduced_flag in _REDUCED_DECODE_FLAGS:
+            # Берём самый сильный коэффициент, при котором не уходим ниже
+            # max_side, но не слабее least (least == 1 — без обязательного)
+            if longest // f >= max_side or f <= least:
+                flag, factor = reduced_flag, f
+                break
+
     arr = np.frombuffer(image_bytes, dtype=np.uint8)
-    img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
+    img = cv2.imdecode(arr, flag)
     if img is None:
         raise ValueError("Не удалось декодировать изображение")
+    stats["decode_ms"] = _ms(start)
+
+    start = time.perf_counter()
+    height, width = img.shape[:2]
+    if resize:
+        img = _fit(img, max_side)
+    elif max_decoded:
+        # Больше, чем даёт самое сильное уменьшение при декодировании
+        img = _fit(img, max_decoded)
+    stats["resize_ms"] = _ms(start)
+
+    original = size or (width, height)
+    stats["original_size"] = list(original)
+    stats["decoded_size"] = [img.shape[1], img.shape[0]]
+    stats["reduce_factor"] = factor
+    stats["bytes_saved"] = int(original[0] * original[1] * 3 - img.nbytes)
     return img
 
 
-# =========================
-# BACK VIEW (FRONTAL PLANE)
-# =========================
-def analyze_back_photo(image_bytes: bytes) -> dict:
-    image = _decode_image(image_bytes)
-    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+def _prepare_rgb(image_bytes: bytes) -> tuple:
+    stats = {}
+    image = _decode_image(image_bytes, stats=stats)
 
-    result = _pose_warmup.process(rgb)
+    # BGR → RGB на месте: без второй копии изображения
+    start = time.perf_counter()
+    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+    stats["convert_ms"] = _ms(start)
+    return rgb, stats
 
+
+def _aspect(rgb) -> float:
+    height, width = rgb.shape[:2]
+    return width / height
+
+
+def _person_box(rgb, confidence: float):
+    # Нормированный (x0, y0, x1, y1) вокруг позы или None — вырез не нужен
+    small = _fit(rgb, POSE_ROI_PREPASS_SIDE)
+    with pose_engine.checkout(POSE_ROI_COMPLEXITY, confidence) as pose:
+        result = pose.process(small)
     if not result.pose_landmarks:
-        raise ValueError("Контуры тела не обнаружены (вид со спины)")
+        return None
+
+    # Все 33 точки: поле добавляет место над головой и под стопами
+    xy = metrics.landmarks_to_array(result.pose_landmarks)[:, :2]
+    (x0, y0), (x1, y1) = xy.min(axis=0), xy.max(axis=0)
+    margin_x = (x1 - x0) * POSE_ROI_MARGIN
+    margin_y = (y1 - y0) * POSE_ROI_MARGIN
+    x0, x1 = max(0.0, x0 - margin_x), min(1.0, x1 + margin_x)
+    y0, y1 = max(0.0, y0 - margin_y), min(1.0, y1 + margin_y)
+    if x1 <= x0 or y1 <= y0 or (x1 - x0) * (y1 - y0) > POSE_ROI_MAX_AREA:
+        return None
+    return float(x0), float(y0), float(x1), float(y1)
+
 
-    lm = result.pose_landmarks.landmark
+def _prepare_roi(image_bytes: bytes, confidence: float) -> tuple:
+    rgb, stats = _prepare_rgb(image_bytes)
+    height, width = rgb.shape[:2]
+    whole = (rgb, (0, 0, width, height), (width, height), stats)
 
-    ls = lm[PoseLandmark.LEFT_SHOULDER]
-    rs = lm[PoseLandmark.RIGHT_SHOULDER]
-    lh = lm[PoseLandmark.LEFT_HIP]
-    rh = lm[PoseLandmark.RIGHT_HIP]
+    # Фото не больше ANALYSIS_MAX_SIDE: деталей сверх уже декодированных нет,
+    # а кадрирование вокруг позы MediaPipe делает сам
+    original = stats["original_size"]
+    if max(original) <= max(width, height):
+        return whole
 
-    shoulder_diff = abs(ls.y - rs.y)
-    hip_diff = abs(lh.y - rh.y)
+    start = time.perf_counter()
+    box = _person_box(rgb, confidence)
+    stats["roi_ms"] = _ms(start)
+    if box is None:
+        return whole
+    x0, y0, x1, y1 = box
 
-    explanation = []
-    if shoulder_diff > 0.04:
-        explanation.append("Обнаружена асимметрия плеч")
-    if hip_diff > 0.04:
-        explanation.append("Обнаружена асимметрия таза")
-    if not explanation:
-        explanation.append("Значимых асимметрий не обнаружено")
+    # Разрешение, при котором длинная сторона выреза — около ANALYSIS_MAX_SIDE.
+    # Если хватает уже декодированного — режем его, иначе декодируем заново
+    # крупнее (с уменьшением в DCT, где возможно, и без resize всего кадра).
+    # Доля выреза — по декодированному кадру: box в его ориентации, а размер
+    # из заголовка может быть до поворота по EXIF
+    fraction = max((x1 - x0) * width, (y1 - y0) * height) / max(width, height)
+    needed = min(POSE_ROI_SOURCE_SIDE, max(original), ANALYSIS_MAX_SIDE / fraction)
+    if needed > max(width, height):
+        source = _decode_image(
+            image_bytes, int(needed), resize=False, max_decoded=POSE_ROI_SOURCE_SIDE
+        )
+        bgr = True
+    else:
+        source, bgr = rgb, False
+
+    source_height, source_width = source.shape[:2]
+    px = (
+        int(x0 * source_width),
+        int(y0 * source_height),
+        int(np.ceil(x1 * source_width)),
+        int(np.ceil(y1 * source_height)),
+    )
+    crop = source[px[1] : px[3], px[0] : px[2]]
+    # Конвертируется только вырез; результат — непрерывный буфер для MediaPipe
+    crop = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB) if bgr else np.ascontiguousarray(crop)
+    crop = _fit(crop, ANALYSIS_MAX_SIDE)
+
+    stats["roi_ms"] = _ms(start)
+    stats["roi"] = [round(v, 4) for v in box]
+    stats["roi_size"] = [crop.shape[1], crop.shape[0]]
+    return crop, px, (source_width, source_height), stats
+
+
+def _to_full_frame(lm, box: tuple, size: tuple):
+    # Нормированные координаты выреза → нормированные координаты всего фото;
+    # z в MediaPipe в масштабе ширины входа, поэтому масштабируется как x
+    x0, y0, x1, y1 = box
+    width, height = size
+    lm = lm.copy()
+    lm[:, metrics.X] = (x0 + lm[:, metrics.X] * (x1 - x0)) / width
+    lm[:, metrics.Y] = (y0 + lm[:, metrics.Y] * (y1 - y0)) / height
+    lm[:, metrics.Z] *= (x1 - x0) / width
+    return lm
+
+
+def _visibility(view: str, lm) -> float:
+    return float(lm[_KEY_LANDMARKS[view], metrics.VISIBILITY].mean())
+
+
+def _detect(view: str, rgb, complexity: int, confidence: float, stats: dict):
+    tiers = POSE_CASCADE_TIERS if POSE_CASCADE else (complexity,)
+
+    # Лучшая из найденных поз: если ни одна ступень не дала нужной
+    # уверенности, берём самую уверенную, а не отказываем
+    best = None
+    attempts = 0
+    start = time.perf_counter()
+    for tier in tiers:
+        attempts += 1
+        with pose_engine.checkout(tier, confidence) as pose:
+            result = pose.process(rgb)
+        if not result.pose_landmarks:
+            continue
+
+        lm = metrics.landmarks_to_array(result.pose_landmarks)
+        visibility = _visibility(view, lm)
+        if best is None or visibility > best[2]:
+            best = (lm, tier, visibility)
+        if visibility >= POSE_CASCADE_MIN_VISIBILITY:
+            break
+    stats["process_ms"] = _ms(start)
+    stats["attempts"] = attempts
+
+    if best is None:
+        raise PoseNotFound(f"Контуры тела не обнаружены ({VIEW_LABELS[view]})")
+
+    lm, stats["model_complexity"], visibility = best
+    stats["visibility"] = round(visibility, 3)
+    return lm
+
+
+def _landmarks(view: str, image_bytes: bytes, complexity: int, confidence: float):
+    # -> landmarks (33, 4) в координатах всего фото, его aspect, статистика
+    if not POSE_ROI:
+        rgb, stats = _prepare_rgb(image_bytes)
+        return _detect(view, rgb, complexity, confidence, stats), _aspect(rgb), stats
+
+    rgb, box, size, stats = _prepare_roi(image_bytes, confidence)
+    lm = _detect(view, rgb, complexity, confidence, stats)
+    return _to_full_frame(lm, box, size), size[0] / size[1], stats
+
+
+# =========================
+# SINGLE PHOTO
+# =========================
+def _analyze_photo(view: str, image_bytes: bytes, complexity: int, confidence: float):
+    lm, aspect, preprocess = _landmarks(view, image_bytes, complexity, confidence)
+    # Пояснения — по округлённым значениям, как и уровни риска: иначе
+    # пересчёт по сохранённым метрикам (rescore) расходится на границах порогов
+    values = metrics.rounded(view, metrics.compute(view, lm, aspect))
 
     return {
-        "shoulder_diff": round(float(shoulder_diff), 3),
-        "hip_diff": round(float(hip_diff), 3),
-        "explanation": explanation,
+        **values,
+        "explanation": risk.explain(view, values),
+        "preprocess": preprocess,
+        # Сырые landmarks — для landmarks.py; в ответ API не попадают
+        "landmarks": {"aspect": aspect, "data": lm.tolist()},
     }
 
 
+def analyze_back_photo(image_bytes: bytes) -> dict:
+    # Фронтальная плоскость
+    return _analyze_photo(
+        "back", image_bytes, BACK_MODEL_COMPLEXITY, BACK_MIN_CONFIDENCE
+    )
+
+
+def analyze_side_photo(image_bytes: bytes) -> dict:
+    # Сагиттальная плоскость
+    return _analyze_photo(
+        "side", image_bytes, SIDE_MODEL_COMPLEXITY, SIDE_MIN_CONFIDENCE
+    )
+
+
 # =========================
-# SIDE VIEW (SAGITTAL PLANE)
+# MULTI-FRAME (VIDEO / BURST)
 # =========================
-def analyze_side_photo(image_bytes: bytes) -> dict:
-    image = _decode_image(image_bytes)
-    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
 
-    with Pose(
-        static_image_mode=True,
-        model_complexity=1,
-        enable_segmentation=False,
-        min_detection_confidence=0.5,
-    ) as pose:
-        result = pose.process(rgb)
+# Не больше стольких кадров на ракурс — память ограничена числом кадров
+VIDEO_MAX_FRAMES = int(os.getenv("VIDEO_MAX_FRAMES", "60"))
+
+
+def _video_frames(data: bytes, limit: int):
+    # VideoCapture читает только из файла
+    with tempfile.NamedTemporaryFile(suffix=".video", delete=False) as tmp:
+        tmp.write(data)
+        path = tmp.name
+
+    capture = cv2.VideoCapture(path)
+    try:
+        if not capture.isOpened():
+            raise ValueError("Не удалось открыть видео")
+
+        # Кадры берутся равномерно по всему ролику
+        total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        stride = max(1, -(-total // limit)) if total > 0 else 1
+
+        index = 0
+        yielded = 0
+        while yielded < limit:
+            if not capture.grab():
+                break
+            if index % stride == 0:
+                ok, frame = capture.retrieve()
+                if ok:
+                    yielded += 1
+                    yield frame
+            index += 1
+    finally:
+        capture.release()
+        os.unlink(path)
+
+
+def _iter_frames(blobs: list, max_side: int = ANALYSIS_MAX_SIDE):
+    # Кадры идут по одному: в памяти только текущий кадр
+    remaining = VIDEO_MAX_FRAMES
+    for data in blobs:
+        if remaining <= 0:
+            break
+        if sniff_format(data):
+            frames = [_decode_image(data, max_side)]
+        else:
+            frames = _video_frames(data, remaining)
+
+        for frame in frames:
+            if remaining <= 0:
+                break
+            remaining -= 1
+            frame = _fit(frame, max_side)
+            yield cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frame)
 
-    if not result.pose_landmarks:
-        raise ValueError("Контуры тела не обнаружены (вид сбоку)")
 
-    lm = result.pose_landmarks.landmark
+def _track(blobs: list, complexity: int, confidence: float):
+    poses = []
+    frames = 0
+    aspect = 1.0
+    start = time.perf_counter()
 
-    nose = lm[PoseLandmark.NOSE]
-    shoulder = lm[PoseLandmark.RIGHT_SHOULDER]
-    ankle = lm[PoseLandmark.RIGHT_ANKLE]
+    # Режим трекинга: детектор запускается только на первом кадре или при
+    # потере позы, дальше модель уточняет landmarks предыдущего кадра
+    with pose_engine.checkout(complexity, confidence, static=False) as pose:
+        for rgb in _iter_frames(blobs):
+            frames += 1
+            aspect = _aspect(rgb)
+            result = pose.process(rgb)
+            if result.pose_landmarks:
+                poses.append(metrics.landmarks_to_array(result.pose_landmarks))
 
-    forward_head = abs(nose.x - shoulder.x)
-    trunk_lean = abs(shoulder.x - ankle.x)
+    if not poses:
+        return None, frames, aspect, _ms(start)
+    return np.stack(poses), frames, aspect, _ms(start)
 
-    explanation = []
-    if forward_head > 0.06:
-        explanation.append("Выдвижение головы вперёд")
-    if trunk_lean > 0.06:
-        explanation.append("Отклонение корпуса")
-    if not explanation:
-        explanation.append("Значимых отклонений не обнаружено")
+
+def _aggregate(view: str, values: dict) -> tuple:
+    # Медиана устойчива к отдельным «выбросам» позы
+    median = {name: np.median(v) for name, v in values.items()}
+    spread = {
+        name: np.subtract(*np.percentile(v, [75, 25])) for name, v in values.items()
+    }
+
+    # Стабильность: доля кадров с тем же уровнем риска, что и у медианы
+    rule = risk.ACTIVE.frontal if view == "back" else risk.ACTIVE.sagittal
+    agree = risk.plane_level(rule, values) == risk.plane_level(rule, median)
+
+    return (
+        median,
+        metrics.rounded(view, spread),
+        round(float(np.mean(agree)), 3),
+    )
+
+
+def _analyze_frames(view: str, blobs: list, complexity: int, confidence: float):
+    lm, frames, aspect, elapsed = _track(blobs, complexity, confidence)
+    if lm is None:
+        raise PoseNotFound(f"Контуры тела не обнаружены ({VIEW_LABELS[view]})")
+
+    # Все кадры сразу: (N, 33, 4) → по массиву (N,) на метрику
+    values = metrics.compute(view, lm, aspect)
+    median, spread, stability = _aggregate(view, values)
+    median = metrics.rounded(view, median)
 
     return {
-        "forward_head": round(float(forward_head), 3),
-        "trunk_lean": round(float(trunk_lean), 3),
-        "explanation": explanation,
+        **median,
+        "frames": {"total": frames, "detected": len(lm), "process_ms": elapsed},
+        "spread": spread,
+        "stability": stability,
+        "explanation": risk.explain(view, median),
+        "landmarks": {"aspect": aspect, "data": lm.tolist()},
     }
+
+
+def analyze_back_frames(blobs: list) -> dict:
+    return _analyze_frames("back", blobs, BACK_MODEL_COMPLEXITY, BACK_MIN_CONFIDENCE)
+
+
+def analyze_side_frames(blobs: list) -> dict:
+    return _analyze_frames("side", blobs, SIDE_MODEL_COMPLEXITY, SIDE_MIN_CONFIDENCE)
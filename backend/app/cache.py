@@ -0,0 +1,218 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# -------------------------
+# CONFIG
+# -------------------------
+
+# Число результатов в памяти (0 — кэш выключен)
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "512"))
+
+# Время жизни записи (секунды)
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "86400"))
+
+# Необязательное постоянное хранилище (файл SQLite), переживает рестарты
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH")
+
+# Предел записей в файле; лишние старые и просроченные удаляются
+RESULT_CACHE_MAX_ROWS = int(os.getenv("RESULT_CACHE_MAX_ROWS", "100000"))
+
+# Чистка файла — раз в столько записей
+RESULT_CACHE_PURGE_EVERY = int(os.getenv("RESULT_CACHE_PURGE_EVERY", "1000"))
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(view: str, params: str, image_bytes: bytes) -> str:
+    digest = hashlib.blake2b(image_bytes, digest_size=20)
+    digest.update(b"\0" + view.encode() + b"\0" + params.encode())
+    return digest.hexdigest()
+
+
+# =========================
+# DISK STORE (SQLITE)
+# =========================
+class SqliteStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        # WAL позволяет нескольким процессам читать, пока один пишет
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str, ttl: float):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > ttl:
+            return None
+        return row
+
+    def set(self, key: str, value: str, created_at: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, created_at) "
+                "VALUES (?, ?, ?)",
+                (key, value, created_at),
+            )
+            self._conn.commit()
+
+    def purge(self, ttl: float, max_rows: int) -> int:
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM results WHERE created_at < ?", (time.time() - ttl,)
+            )
+            removed = cur.rowcount
+            # Сверх предела — самые старые записи
+            cur = self._conn.execute(
+                "DELETE FROM results WHERE key IN ("
+                "SELECT key FROM results ORDER BY created_at DESC "
+                "LIMIT -1 OFFSET ?)",
+                (max_rows,),
+            )
+            self._conn.commit()
+            return removed + cur.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# =========================
+# LRU CACHE
+# =========================
+class ResultCache:
+    def __init__(self, size: int, ttl: float, store: SqliteStore = None):
+        self.size = size
+        self.ttl = ttl
+        self.store = store
+
+        # key -> (json, created_at); значения хранятся сериализованными,
+        # чтобы вызывающий код не мог изменить закэшированный результат
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self.store_errors = 0
+        self.writes = 0
+        self.lookup_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def get(self, key: str):
+        if not self.enabled:
+            return None
+
+        start = time.perf_counter()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and time.time() - item[1] > self.ttl:
+                del self._items[key]
+                self.expired += 1
+                item = None
+            if item is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+
+        if item is None and self.store is not None:
+            item = self._store_call(self.store.get, key, self.ttl)
+            if item is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._put(key, item)
+
+        with self._lock:
+            if item is None:
+                self.misses += 1
+            self.lookup_seconds += time.perf_counter() - start
+
+        return None if item is None else json.loads(item[0])
+
+    def _put(self, key: str, item: tuple):
+        self._items[key] = item
+        self._items.move_to_end(key)
+        while len(self._items) > self.size:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    def set(self, key: str, value: dict):
+        if not self.enabled:
+            return
+
+        item = (json.dumps(value, ensure_ascii=False), time.time())
+        with self._lock:
+            self._put(key, item)
+            self.writes += 1
+            purge = self.writes % RESULT_CACHE_PURGE_EVERY == 0
+        if self.store is not None:
+            self._store_call(self.store.set, key, *item)
+            if purge:
+                self.purge()
+
+    def purge(self) -> int:
+        if self.store is None:
+            return 0
+        return self._store_call(self.store.purge, self.ttl, RESULT_CACHE_MAX_ROWS) or 0
+
+    def _store_call(self, fn, *args):
+        # Файл кэша — только ускорение: блокировка или ошибка SQLite
+        # не должна ронять анализ, который уже выполнен
+        try:
+            return fn(*args)
+        except sqlite3.Error as e:
+            with self._lock:
+                self.store_errors += 1
+            logger.warning("Result cache store error: %s", e)
+            return None
+
+    def close(self):
+        if self.store is not None:
+            self._store_call(self.store.close)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "persistent": self.store is not None,
+                "size": self.size,
+                "entries": len(self._items),
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expired": self.expired,
+                "store_errors": self.store_errors,
+                "avg_lookup_us": (
+                    round(self.lookup_seconds / lookups * 1e6, 1) if lookups else 0.0
+                ),
+            }
+
+
+result_cache = ResultCache(
+    RESULT_CACHE_SIZE,
+    RESULT_CACHE_TTL,
+    SqliteStore(RESULT_CACHE_PATH) if RESULT_CACHE_PATH and RESULT_CACHE_SIZE else None,
+)
+
+# Просроченное с прошлых запусков удаляется сразу
+result_cache.purge()
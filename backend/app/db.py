@@ -1,7 +1,12 @@
 import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 from dotenv import load_dotenv
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 load_dotenv()
@@ -10,7 +15,31 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set")
 
-engine = create_engine(DATABASE_URL)
+# -------------------------
+# CONNECTION POOL
+# -------------------------
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Supabase/облачные прокси закрывают простаивающие соединения
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+
+
+def _engine_options(url: str) -> dict:
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if not url.startswith("sqlite"):
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    return options
+
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -19,3 +48,81 @@ SessionLocal = sessionmaker(
 )
 
 Base = declarative_base()
+
+
+# -------------------------
+# SESSION LIFECYCLE
+# -------------------------
+@contextmanager
+def session_scope():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_db():
+    # FastAPI dependency: одна сессия на запрос
+    with session_scope() as db:
+        yield db
+
+
+# -------------------------
+# DB TIME PER REQUEST
+# -------------------------
+
+# [секунды, число запросов] для текущего HTTP-запроса
+_db_time = ContextVar("db_time", default=None)
+
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "queries": 0, "seconds": 0.0}
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    acc = _db_time.get()
+    if acc is not None:
+        acc[0] += elapsed
+        acc[1] += 1
+
+
+@contextmanager
+def track_db_time():
+    acc = [0.0, 0]
+    token = _db_time.set(acc)
+    try:
+        yield acc
+    finally:
+        _db_time.reset(token)
+        with _stats_lock:
+            _stats["requests"] += 1
+            _stats["queries"] += acc[1]
+            _stats["seconds"] += acc[0]
+
+
+def pool_usage() -> tuple:
+    # (занято, размер); у пулов SQLite размера нет
+    pool = engine.pool
+    checked_out = pool.checkedout() if hasattr(pool, "checkedout") else 0
+    size = pool.size() if hasattr(pool, "size") else 0
+    return checked_out, size
+
+
+def stats() -> dict:
+    with _stats_lock:
+        requests = _stats["requests"]
+        return {
+            "pool": engine.pool.status(),
+            "requests": requests,
+            "queries": _stats["queries"],
+            "avg_db_ms": (
+                round(_stats["seconds"] / requests * 1000, 2) if requests else 0.0
+            ),
+        }
@@ -0,0 +1,104 @@
+import csv
+import io
+import os
+
+import orjson
+
+from app.db import session_scope
+from app.models import Screening
+
+# -------------------------
+# STREAMING EXPORT
+# -------------------------
+
+# Сколько строк за раз тянется с сервера БД (server-side cursor)
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+EXPORT_COLUMNS = [
+    "id",
+    "user_id",
+    "date",
+    "frontal_risk",
+    "sagittal_risk",
+    "overall_risk",
+    "ruleset_version",
+    "metrics",
+]
+
+
+def _rows(date_from=None, date_to=None, risk=None):
+    # Сессия живёт внутри генератора: ответ стримится уже после выхода
+    # из обработчика, когда зависимости запроса закрыты
+    with session_scope() as db:
+        query = db.query(
+            Screening.id,
+            Screening.user_id,
+            Screening.created_at,
+            Screening.frontal_risk,
+            Screening.sagittal_risk,
+            Screening.overall_risk,
+            Screening.ruleset_version,
+            Screening.metrics,
+        )
+        if date_from is not None:
+            query = query.filter(Screening.created_at >= date_from)
+        if date_to is not None:
+            query = query.filter(Screening.created_at < date_to)
+        if risk:
+            query = query.filter(Screening.overall_risk.in_(risk))
+
+        # yield_per включает stream_results: строки не буферизуются целиком
+        query = query.order_by(Screening.created_at, Screening.id).yield_per(
+            EXPORT_CHUNK_SIZE
+        )
+        for r in query:
+            yield r
+
+
+def _record(r) -> dict:
+    return {
+        "id": r.id.hex,
+        "user_id": r.user_id.hex,
+        "date": r.created_at.isoformat(),
+        "frontal_risk": r.frontal_risk,
+        "sagittal_risk": r.sagittal_risk,
+        "overall_risk": r.overall_risk,
+        "ruleset_version": r.ruleset_version,
+        "metrics": r.metrics,
+    }
+
+
+def iter_ndjson(**filters):
+    chunk = []
+    for r in _rows(**filters):
+        chunk.append(orjson.dumps(_record(r)))
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield b"\n".join(chunk) + b"\n"
+            chunk = []
+    if chunk:
+        yield b"\n".join(chunk) + b"\n"
+
+
+def iter_csv(**filters):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    # BOM — чтобы Excel корректно открыл кириллицу
+    writer.writerow(EXPORT_COLUMNS)
+    yield "\ufeff" + buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    rows = 0
+    for r in _rows(**filters):
+        record = _record(r)
+        record["metrics"] = orjson.dumps(record["metrics"]).decode()
+        writer.writerow([record[name] for name in EXPORT_COLUMNS])
+        rows += 1
+        if rows % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,69 @@
+import struct
+
+# -------------------------
+# IMAGE HEADER PARSING
+# -------------------------
+# Чтение формата и размеров из заголовка файла без декодирования пикселей
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+JPEG_SIGNATURE = b"\xff\xd8\xff"
+
+# Маркеры SOF (Start Of Frame), содержащие размеры JPEG
+# (0xC4 DHT, 0xC8 JPG, 0xCC DAC — не кадры)
+_JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def sniff_format(data: bytes):
+    if data.startswith(JPEG_SIGNATURE):
+        return "jpeg"
+    if data.startswith(PNG_SIGNATURE):
+        return "png"
+    return None
+
+
+def _png_size(data: bytes):
+    # IHDR всегда первый чанк: 8 байт сигнатуры + 4 длина + 4 тип + w + h
+    if len(data) < 24 or data[12:16] != b"IHDR":
+        return None
+    width, height = struct.unpack(">II", data[16:24])
+    return width, height
+
+
+def _jpeg_size(data: bytes):
+    pos = 2
+    end = len(data)
+
+    while pos + 4 <= end:
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+
+        # Заполняющие 0xFF и маркеры без длины
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+
+        (length,) = struct.unpack(">H", data[pos + 2 : pos + 4])
+        if marker in _JPEG_SOF_MARKERS:
+            if pos + 9 > end:
+                return None
+            height, width = struct.unpack(">HH", data[pos + 5 : pos + 9])
+            return width, height
+        if marker == 0xDA:
+            # Начались данные изображения, а SOF так и не встретился
+            return None
+        pos += 2 + length
+
+    return None
+
+
+def read_image_size(data: bytes):
+    fmt = sniff_format(data)
+    if fmt == "png":
+        return _png_size(data)
+    if fmt == "jpeg":
+        return _jpeg_size(data)
+    return None
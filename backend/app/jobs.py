@@ -0,0 +1,305 @@
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import case
+
+from app import landmarks, stats
+from app.db import session_scope
+from app.models import AnalysisJob, Screening
+from app.pipeline import AnalysisError, analyze_views
+from app.risk import assess
+
+# -------------------------
+# CONFIG
+# -------------------------
+
+# Сколько задач обрабатывается одновременно в одном процессе API
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "2"))
+
+# Как часто потребитель проверяет таблицу, если его не разбудили (секунды)
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+
+# Задача в статусе running дольше этого времени считается брошенной
+# (процесс упал или был перезапущен) и возвращается в очередь
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "300"))
+
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# После ошибки БД потребитель ждёт, удваивая паузу до этого предела (секунды)
+JOB_ERROR_BACKOFF_MAX = float(os.getenv("JOB_ERROR_BACKOFF_MAX", "30"))
+
+FINAL_STATUSES = ("done", "failed")
+
+_wakeup = None
+_tasks = []
+
+logger = logging.getLogger(__name__)
+
+
+# =========================
+# DB OPERATIONS (SYNC)
+# =========================
+def _create(user_uuid, back_bytes: bytes, side_bytes: bytes) -> uuid.UUID:
+    job_id = uuid.uuid4()
+    with session_scope() as db:
+        db.add(
+            AnalysisJob(
+                id=job_id,
+                user_id=user_uuid,
+                back_photo=back_bytes,
+                side_photo=side_bytes,
+            )
+        )
+        db.commit()
+    return job_id
+
+
+def _requeue_stale():
+    cutoff = datetime.utcnow() - timedelta(seconds=JOB_STALE_AFTER)
+    # Попытки исчерпаны — скорее всего, фото роняет процесс (OOM, сбой в
+    # MediaPipe): такую задачу не возвращаем в очередь, иначе она будет
+    # ронять контейнер каждые JOB_STALE_AFTER секунд
+    exhausted = AnalysisJob.attempts >= JOB_MAX_ATTEMPTS
+
+    def unless_exhausted(value, column):
+        return case((exhausted, value), else_=column)
+
+    with session_scope() as db:
+        db.query(AnalysisJob).filter(
+            AnalysisJob.status == "running",
+            AnalysisJob.updated_at < cutoff,
+        ).update(
+            {
+                "status": unless_exhausted("failed", "queued"),
+                "status_code": unless_exhausted(500, AnalysisJob.status_code),
+                "error": unless_exhausted(
+                    "Обработка прерывалась на каждой попытке", AnalysisJob.error
+                ),
+                "back_photo": unless_exhausted(b"", AnalysisJob.back_photo),
+                "side_photo": unless_exhausted(b"", AnalysisJob.side_photo),
+                "updated_at": datetime.utcnow(),
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+
+
+def _claim():
+    with session_scope() as db:
+        # SKIP LOCKED: несколько процессов разбирают очередь без конфликтов
+        job = (
+            db.query(AnalysisJob)
+            .filter(AnalysisJob.status == "queued")
+            .order_by(AnalysisJob.created_at)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if job is None:
+            db.rollback()
+            return None
+
+        job.status = "running"
+        job.attempts += 1
+        claimed = (job.id, job.user_id, job.back_photo, job.side_photo, job.attempts)
+        db.commit()
+        return claimed
+
+
+def _finish(job_id, **values):
+    if values.get("status") == "failed":
+        # Фото неудачной задачи больше не нужны
+        values.update(back_photo=b"", side_photo=b"")
+    with session_scope() as db:
+        db.query(AnalysisJob).filter(AnalysisJob.id == job_id).update(
+            {**values, "updated_at": datetime.utcnow()},
+            synchronize_session=False,
+        )
+        db.commit()
+
+
+def _complete(job_id, user_uuid, back_metrics, side_metrics, points):
+    assessment = assess(back_metrics, side_metrics)
+    screening_id = uuid.uuid4()
+
+    with session_scope() as db:
+        # Обследование, счётчики и статус задачи — в одной транзакции
+        record = Screening.from_assessment(
+            user_uuid,
+            assessment,
+            back_metrics,
+            side_metrics,
+            id=screening_id,
+        )
+        db.add(record)
+        db.add_all(landmarks.rows(screening_id, points))
+        db.flush()
+        stats.record(db, [record])
+        db.query(AnalysisJob).filter(AnalysisJob.id == job_id).update(
+            {
+                "status": "done",
+                "status_code": 200,
+                "screening_id": screening_id,
+                # Фото больше не нужны
+                "back_photo": b"",
+                "side_photo": b"",
+                "updated_at": datetime.utcnow(),
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+
+
+def _load(job_id):
+    with session_scope() as db:
+        row = (
+            db.query(
+                AnalysisJob.id,
+                AnalysisJob.status,
+                AnalysisJob.status_code,
+                AnalysisJob.error,
+                AnalysisJob.screening_id,
+                AnalysisJob.created_at,
+                AnalysisJob.updated_at,
+            )
+            .filter(AnalysisJob.id == job_id)
+            .first()
+        )
+        if row is None:
+            return None
+
+        job = {
+            "job_id": row.id.hex,
+            "status": row.status,
+            "status_code": row.status_code,
+            "error": row.error,
+            "session_id": row.screening_id.hex if row.screening_id else None,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+            "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+        }
+
+        if row.screening_id:
+            record = db.get(Screening, row.screening_id)
+            job["result"] = {
+                "session_id": record.id.hex,
+                "frontal_risk": record.frontal_risk,
+                "sagittal_risk": record.sagittal_risk,
+                "overall_risk": record.overall_risk,
+                "ruleset_version": record.ruleset_version,
+                "explanation": record.explanation,
+                "metrics": record.metrics,
+            }
+        return job
+
+
+# =========================
+# CONSUMER
+# =========================
+async def _process(claimed):
+    job_id, user_uuid, back_bytes, side_bytes, attempts = claimed
+
+    try:
+        back_metrics, side_metrics, _, points = await analyze_views(
+            back_bytes, side_bytes
+        )
+    except AnalysisError as e:
+        if e.status_code in (503, 504) and attempts < JOB_MAX_ATTEMPTS:
+            # Временная перегрузка — вернём задачу в очередь
+            await asyncio.to_thread(_finish, job_id, status="queued")
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+        else:
+            await asyncio.to_thread(
+                _finish,
+                job_id,
+                status="failed",
+                status_code=e.status_code,
+                error=e.detail,
+            )
+        return
+    except Exception as e:
+        await asyncio.to_thread(
+            _finish, job_id, status="failed", status_code=500, error=str(e)
+        )
+        return
+
+    await asyncio.to_thread(
+        _complete, job_id, user_uuid, back_metrics, side_metrics, points
+    )
+
+
+def _release(claimed, error: Exception):
+    # Задача, на которой упал потребитель: в очередь, пока есть попытки
+    job_id, attempts = claimed[0], claimed[4]
+    if attempts < JOB_MAX_ATTEMPTS:
+        _finish(job_id, status="queued")
+    else:
+        _finish(job_id, status="failed", status_code=500, error=str(error))
+
+
+async def _consume():
+    backoff = JOB_POLL_INTERVAL
+    while True:
+        claimed = None
+        try:
+            claimed = await asyncio.to_thread(_claim)
+            if claimed is None:
+                try:
+                    await asyncio.wait_for(_wakeup.wait(), JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    await asyncio.to_thread(_requeue_stale)
+                _wakeup.clear()
+            else:
+                await _process(claimed)
+            backoff = JOB_POLL_INTERVAL
+        except Exception as e:
+            # Обрыв соединения с БД не должен останавливать потребителя навсегда
+            logger.exception("Job consumer error")
+            if claimed is not None:
+                try:
+                    await asyncio.to_thread(_release, claimed, e)
+                except Exception:
+                    # БД всё ещё недоступна — задачу вернёт _requeue_stale
+                    logger.exception("Could not release job %s", claimed[0])
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, JOB_ERROR_BACKOFF_MAX)
+
+
+async def start():
+    global _wakeup
+
+    _wakeup = asyncio.Event()
+    await asyncio.to_thread(_requeue_stale)
+    _tasks.extend(asyncio.create_task(_consume()) for _ in range(JOB_CONCURRENCY))
+
+
+async def stop():
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+
+
+# =========================
+# PUBLIC API
+# =========================
+async def submit(user_uuid, back_bytes: bytes, side_bytes: bytes) -> str:
+    job_id = await asyncio.to_thread(_create, user_uuid, back_bytes, side_bytes)
+    if _wakeup is not None:
+        _wakeup.set()
+    return job_id.hex
+
+
+async def get(job_id, wait: float = 0):
+    # Long-poll: ждём завершения задачи не дольше wait секунд
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+
+    while True:
+        job = await asyncio.to_thread(_load, job_id)
+        if job is None or job["status"] in FINAL_STATUSES:
+            return job
+        if loop.time() >= deadline:
+            return job
+        await asyncio.sleep(min(0.5, max(0.0, deadline - loop.time())))
@@ -0,0 +1,114 @@
+import os
+
+import numpy as np
+from sqlalchemy import select
+
+from app.models import ScreeningLandmarks
+
+# -------------------------
+# LANDMARK STORAGE
+# -------------------------
+# Массив (frames, 33, 4) хранится как сырые байты: float32 — 528 байт
+# на фото, float16 — 264 байта (погрешность ~5e-4, для метрик с 3 знаками
+# бывает заметна)
+
+# Как metrics.LANDMARK_COUNT; metrics не импортируется, чтобы не тянуть mediapipe в API
+LANDMARK_COUNT = 33
+
+LANDMARK_DTYPE = os.getenv("LANDMARK_DTYPE", "float32")
+
+# Сколько записей читается за раз при пересчёте по всей истории
+LANDMARK_CHUNK_SIZE = int(os.getenv("LANDMARK_CHUNK_SIZE", "5000"))
+
+_DTYPES = {"float32": np.float32, "float16": np.float16}
+
+
+def pack(data, dtype: str = LANDMARK_DTYPE) -> tuple:
+    arr = np.asarray(data, dtype=_DTYPES[dtype]).reshape(-1, LANDMARK_COUNT, 4)
+    return arr.shape[0], arr.tobytes()
+
+
+def unpack(data: bytes, dtype: str, frames: int = 1) -> np.ndarray:
+    # Без копирования: массив смотрит в буфер (только чтение)
+    return np.frombuffer(data, dtype=_DTYPES[dtype]).reshape(frames, LANDMARK_COUNT, 4)
+
+
+def rows(screening_id, landmarks: dict) -> list:
+    # landmarks: view → {"aspect": float, "data": вложенный список} из analysis
+    result = []
+    for view, item in landmarks.items():
+        if not item:
+            continue
+        frames, data = pack(item["data"])
+        result.append(
+            ScreeningLandmarks(
+                screening_id=screening_id,
+                view=view,
+                frames=frames,
+                dtype=LANDMARK_DTYPE,
+                aspect=item["aspect"],
+                data=data,
+            )
+        )
+    return result
+
+
+def iter_chunks(db, view: str, chunk_size: int = LANDMARK_CHUNK_SIZE):
+    # Пачки (ids, aspect (N,), lm (N, 33, 4)) по всем обследованиям с одним кадром.
+    # Байты пачки склеиваются один раз и читаются через np.frombuffer
+    query = (
+        select(
+            ScreeningLandmarks.screening_id,
+            ScreeningLandmarks.aspect,
+            ScreeningLandmarks.dtype,
+            ScreeningLandmarks.data,
+        )
+        .where(ScreeningLandmarks.view == view, ScreeningLandmarks.frames == 1)
+        .order_by(ScreeningLandmarks.screening_id)
+    )
+
+    last_id = None
+    while True:
+        chunk = (
+            query
+            if last_id is None
+            else query.where(ScreeningLandmarks.screening_id > last_id)
+        )
+        batch = db.execute(chunk.limit(chunk_size)).all()
+        if not batch:
+            return
+        last_id = batch[-1].screening_id
+
+        # Пачка может смешивать float16 и float32 — группируем по dtype
+        for dtype in {r.dtype for r in batch}:
+            part = [r for r in batch if r.dtype == dtype]
+            lm = unpack(b"".join(r.data for r in part), dtype, len(part))
+            yield (
+                [r.screening_id for r in part],
+                np.array([r.aspect for r in part], dtype=np.float64),
+                lm,
+            )
+
+
+def iter_series(db, view: str, chunk_size: int = LANDMARK_CHUNK_SIZE // 10):
+    # Обследования по видео / серии кадров: пачки [(id, aspect, lm (F, 33, 4)), ...]
+    query = (
+        select(ScreeningLandmarks)
+        .where(ScreeningLandmarks.view == view, ScreeningLandmarks.frames > 1)
+        .order_by(ScreeningLandmarks.screening_id)
+    )
+
+    last_id = None
+    while True:
+        chunk = (
+            query
+            if last_id is None
+            else query.where(ScreeningLandmarks.screening_id > last_id)
+        )
+        batch = db.scalars(chunk.limit(max(1, chunk_size))).all()
+        if not batch:
+            return
+        last_id = batch[-1].screening_id
+        yield [
+            (r.screening_id, r.aspect, unpack(r.data, r.dtype, r.frames)) for r in batch
+        ]
@@ -1,118 +1,535 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Query
-from typing import Optional
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from fastapi import (
+    Depends,
+    FastAPI,
+    UploadFile,
+    File,
+    Form,
+    HTTPException,
+    Query,
+    Request,
+)
+from fastapi.responses import (
+    JSONResponse,
+    ORJSONResponse,
+    PlainTextResponse,
+    StreamingResponse,
+)
+from sqlalchemy.orm import Session
+from datetime import date, datetime, timedelta
+from typing import List, Optional
 import uuid
 from pydantic import BaseModel
-from app.db import SessionLocal
+from app import startup  # первым из app: от него считается время импорта
+from app import db as database
+from app import jobs, landmarks, pose_engine, stats, telemetry, workers
+from app.cache import result_cache
+from app.export import iter_csv, iter_ndjson
+from app.db import get_db
 from app.models import Screening, User
-from app.analysis import analyze_back_photo, analyze_side_photo
+from app.pagination import NEXT_CURSOR_HEADER, paginate
+from app.pipeline import AnalysisError, analyze_frames, analyze_views
+from app.risk import assess
+from app.uploads import (
+    ANALYZE_MAX_REQUEST_BYTES,
+    BATCH_MAX_REQUEST_BYTES,
+    VIDEO_MAX_REQUEST_BYTES,
+    RequestSizeLimit,
+    read_media_list,
+    read_upload,
+)
+
+startup.imports_done()
+
+# Максимум обследований в одном запросе /analyze/batch
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+
+# Типы файлов для /analyze/video (кадры-фото или короткий ролик)
+MEDIA_TYPES = ("image/jpeg", "image/png", "video/mp4", "video/quicktime", "video/webm")
+
+# Сколько пар фото из пакета анализируются одновременно. Пара — две задачи
+# в пуле, поэтому по умолчанию пакет занимает как раз все воркеры, а очередь
+# остаётся для обычных /analyze; больше половины ёмкости не бывает
+BATCH_CONCURRENCY = min(
+    int(
+        os.getenv("BATCH_CONCURRENCY", str(max(1, (workers.ANALYSIS_WORKERS + 1) // 2)))
+    ),
+    max(1, workers.capacity() // 2),
+)
+
+# Сколько элемент пакета ждёт места в очереди анализа, прежде чем получить 503
+BATCH_QUEUE_WAIT = float(os.getenv("BATCH_QUEUE_WAIT", "120"))
+
+
+# --------------------------------------------------
+# STARTUP / SHUTDOWN
+# --------------------------------------------------
+async def _warm():
+    # Воркеры и модели создаются до первого анализа, а не внутри него;
+    # очередь задач запускается только на прогретых моделях
+    await asyncio.to_thread(startup.warm)
+    await jobs.start()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    telemetry.start()
+    warming = asyncio.create_task(_warm())
+    if startup.STARTUP_WARMUP == "blocking":
+        await warming
+    yield
+    # Поток прогрева не прервать — дожидаемся его перед остановкой воркеров
+    await asyncio.gather(warming, return_exceptions=True)
+    await jobs.stop()
+    workers.shutdown()
+    result_cache.close()
+    telemetry.stop()
+
 
 app = FastAPI(
     title="Spine Deviation Check API",
     version="0.6.0",
+    lifespan=lifespan,
+)
+
+
+# --------------------------------------------------
+# REQUEST SIZE LIMIT
+# --------------------------------------------------
+# Тело запроса ограничено на всех маршрутах загрузки: и по Content-Length,
+# и по фактически принятым байтам
+app.add_middleware(
+    RequestSizeLimit,
+    limits={
+        "/analyze": ANALYZE_MAX_REQUEST_BYTES,
+        "/analyze/batch": BATCH_MAX_REQUEST_BYTES,
+        "/analyze/video": VIDEO_MAX_REQUEST_BYTES,
+    },
 )
 
 
+# --------------------------------------------------
+# DB TIME AND STAGES PER REQUEST
+# --------------------------------------------------
+@app.middleware("http")
+async def db_timing(request: Request, call_next):
+    with database.track_db_time() as acc, telemetry.track_request() as stages:
+        response = await call_next(request)
+
+    timing = f"db;dur={acc[0] * 1000:.1f}"
+    if telemetry.SERVER_TIMING_STAGES and stages:
+        timing += ", " + telemetry.server_timing(stages)
+    response.headers["Server-Timing"] = timing
+    return response
+
+
 # --------------------------------------------------
 # HEALTH CHECK
 # --------------------------------------------------
 @app.get("/health")
 def health_check():
-    return {"status": "ok"}
+    report = startup.report()
+    if not startup.is_ready():
+        # Пока модели не прогреты, балансировщик не должен слать трафик
+        return JSONResponse(
+            status_code=503,
+            content={"status": report["phase"], "startup": report},
+            headers={"Retry-After": str(workers.ANALYSIS_RETRY_AFTER)},
+        )
+
+    return {
+        "status": "ok",
+        "startup": report,
+        "pose_pools": pose_engine.stats(),
+        "workers": workers.stats(),
+        "cache": result_cache.stats(),
+        "db": database.stats(),
+    }
+
+
+# --------------------------------------------------
+# PROMETHEUS METRICS
+# --------------------------------------------------
+def _pool_gauge(field: str):
+    def collect():
+        return [
+            ((str(p["complexity"]), "static" if p["static"] else "tracking"), p[field])
+            for p in pose_engine.stats()
+        ]
+
+    return collect
+
+
+telemetry.register(
+    telemetry.Gauge(
+        "spine_analysis_queue_depth",
+        "Analyses running or waiting for a worker",
+        collect=lambda: [((), workers.stats()["pending"])],
+    )
+)
+telemetry.register(
+    telemetry.Gauge(
+        "spine_analysis_queue_capacity",
+        "Analyses accepted before returning 503",
+        collect=lambda: [((), workers.capacity())],
+    )
+)
+telemetry.register(
+    telemetry.CollectedCounter(
+        "spine_analysis_rejected_total",
+        "Analyses rejected with 503 since start",
+        collect=lambda: [((), workers.stats()["rejected"])],
+    )
+)
+telemetry.register(
+    telemetry.Gauge(
+        "spine_pose_pool_in_use",
+        "Pose instances checked out (in-process pools only)",
+        ("complexity", "mode"),
+        collect=_pool_gauge("in_use"),
+    )
+)
+telemetry.register(
+    telemetry.Gauge(
+        "spine_pose_pool_size",
+        "Pose pool size limit (in-process pools only)",
+        ("complexity", "mode"),
+        collect=_pool_gauge("size"),
+    )
+)
+telemetry.register(
+    telemetry.Gauge(
+        "spine_db_pool_checked_out",
+        "DB connections in use",
+        collect=lambda: [((), database.pool_usage()[0])],
+    )
+)
+telemetry.register(
+    telemetry.Gauge(
+        "spine_db_pool_size",
+        "DB connection pool size",
+        collect=lambda: [((), database.pool_usage()[1])],
+    )
+)
+telemetry.register(
+    telemetry.CollectedCounter(
+        "spine_result_cache_hits_total",
+        "Result cache hits since start",
+        collect=lambda: [((), result_cache.stats()["hits"])],
+    )
+)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(telemetry.render(), media_type="text/plain; version=0.0.4")
 
 
 # --------------------------------------------------
 # ANALYZE ENDPOINT
 # --------------------------------------------------
+async def _check_user(db: Session, user_id: str) -> uuid.UUID:
+    # До чтения файлов и инференса: ошибка в id не должна стоить анализа,
+    # а неизвестный пользователь — падения на внешнем ключе при сохранении
+    try:
+        user_uuid = uuid.UUID(user_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid user_id")
+    if not await asyncio.to_thread(_existing_users, db, {user_uuid}):
+        raise HTTPException(status_code=404, detail="User not found")
+    return user_uuid
+
+
 @app.post("/analyze")
 async def analyze(
     back_photo: UploadFile = File(...),
     side_photo: UploadFile = File(...),  # ← ТЕПЕРЬ ОБЯЗАТЕЛЬНО
     user_id: str = Query(...),
+    mode: str = Query("sync", pattern="^(sync|async)$"),
+    db: Session = Depends(get_db),
 ):
     # ---------- VALIDATION ----------
+    user_uuid = await _check_user(db, user_id)
+
     if back_photo.content_type not in ("image/jpeg", "image/png"):
         raise HTTPException(status_code=400, detail="Неверный формат фото со спины")
 
     if side_photo.content_type not in ("image/jpeg", "image/png"):
         raise HTTPException(status_code=400, detail="Неверный формат фото сбоку")
 
-    back_bytes = await back_photo.read()
-    side_bytes = await side_photo.read()
+    # Фото читаются частями с лимитом размера; формат и разрешение
+    # проверяются по заголовку до декодирования
+    try:
+        with telemetry.timed("upload_read"):
+            back_bytes = await read_upload(back_photo, "со спины")
+            side_bytes = await read_upload(side_photo, "сбоку")
+    except AnalysisError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    # ---------- ASYNC MODE ----------
+    # Задача сохраняется в БД, ответ — сразу; результат: GET /jobs/{job_id}
+    if mode == "async":
+        job_id = await jobs.submit(user_uuid, back_bytes, side_bytes)
+        return JSONResponse(
+            status_code=202,
+            content={"job_id": job_id, "status": "queued"},
+            headers={"Location": f"/jobs/{job_id}"},
+        )
 
     # ---------- ANALYSIS ----------
-    back_metrics = analyze_back_photo(back_bytes)
-    side_metrics = analyze_side_photo(side_bytes)
+    # Инференс выполняется в пуле воркеров, оба ракурса параллельно
+    try:
+        back_metrics, side_metrics, timing, points = await analyze_views(
+            back_bytes, side_bytes
+        )
+    except AnalysisError as e:
+        raise HTTPException(
+            status_code=e.status_code, detail=e.detail, headers=e.headers
+        )
 
-    # ---------- FRONTAL RISK ----------
-    sd = back_metrics["shoulder_diff"]
-    hd = back_metrics["hip_diff"]
+    with telemetry.timed("risk"):
+        assessment = assess(back_metrics, side_metrics)
 
-    if sd < 0.03 and hd < 0.03:
-        frontal_risk = "low"
-    elif sd < 0.06 and hd < 0.06:
-        frontal_risk = "medium"
-    else:
-        frontal_risk = "high"
+    # ---------- SAVE TO DB ----------
+    # id генерируется на клиенте — refresh после commit не нужен
+    record_id = uuid.uuid4()
+    record = Screening.from_assessment(
+        user_uuid, assessment, back_metrics, side_metrics, id=record_id
+    )
+    with telemetry.timed("db_commit"):
+        await asyncio.to_thread(_save, db, [record], landmarks.rows(record_id, points))
 
-    # ---------- SAGITTAL RISK ----------
-    fh = side_metrics["forward_head"]
-    tl = side_metrics["trunk_lean"]
+    return {
+        "session_id": record_id.hex,
+        **assessment,
+        "metrics": {
+            "back": back_metrics,
+            "side": side_metrics,
+            "timing": timing,
+        },
+    }
 
-    if fh < 0.04 and tl < 0.04:
-        sagittal_risk = "low"
-    elif fh < 0.07 and tl < 0.07:
-        sagittal_risk = "medium"
-    else:
-        sagittal_risk = "high"
 
-    # ---------- OVERALL RISK ----------
-    if frontal_risk == "high" or sagittal_risk == "high":
-        overall_risk = "high"
-    elif frontal_risk == "medium" or sagittal_risk == "medium":
-        overall_risk = "medium"
-    else:
-        overall_risk = "low"
+def _save(db: Session, records: list, landmark_rows: list = ()):
+    db.add_all(records)
+    db.add_all(landmark_rows)
+    # flush проставляет created_at, по которому считаются дневные счётчики
+    db.flush()
+    stats.record(db, records)
+    db.commit()
 
-    explanation = []
-    explanation.extend(back_metrics["explanation"])
-    explanation.extend(side_metrics["explanation"])
-    explanation.append(
-        "Результат является предварительной оценкой и не заменяет консультацию врача."
-    )
 
-    # ---------- SAVE TO DB ----------
-    db = SessionLocal()
+def _existing_users(db: Session, user_ids: set) -> set:
+    if not user_ids:
+        return set()
+    rows = db.query(User.id).filter(User.id.in_(user_ids)).all()
+    return {row.id for row in rows}
+
+
+# --------------------------------------------------
+# VIDEO / MULTI-FRAME ANALYZE
+# --------------------------------------------------
+@app.post("/analyze/video")
+async def analyze_video(
+    back_media: List[UploadFile] = File(...),
+    side_media: List[UploadFile] = File(...),
+    user_id: str = Query(...),
+    db: Session = Depends(get_db),
+):
+    user_uuid = await _check_user(db, user_id)
+
+    # Каждый ракурс: один ролик или серия фото (burst)
+    for media, label in ((back_media, "со спины"), (side_media, "сбоку")):
+        for upload in media:
+            if upload.content_type not in MEDIA_TYPES:
+                raise HTTPException(
+                    status_code=400, detail=f"Неверный формат файла {label}"
+                )
+
     try:
-        record = Screening(
-            user_id=uuid.UUID(user_id),
-            frontal_risk=frontal_risk,
-            sagittal_risk=sagittal_risk,
-            overall_risk=overall_risk,
-            metrics={
-                "back": back_metrics,
-                "side": side_metrics,
-            },
-            explanation=explanation,
+        back_blobs = await read_media_list(back_media, "со спины")
+        side_blobs = await read_media_list(side_media, "сбоку")
+
+        back_metrics, side_metrics, timing, points = await analyze_frames(
+            back_blobs, side_blobs
+        )
+    except AnalysisError as e:
+        raise HTTPException(
+            status_code=e.status_code, detail=e.detail, headers=e.headers
         )
-        db.add(record)
-        db.commit()
-        db.refresh(record)
-    finally:
-        db.close()
+
+    # Риск считается по медианам — отдельные неудачные кадры его не «качают»
+    assessment = assess(back_metrics, side_metrics)
+
+    record_id = uuid.uuid4()
+    record = Screening.from_assessment(
+        user_uuid, assessment, back_metrics, side_metrics, id=record_id
+    )
+    await asyncio.to_thread(_save, db, [record], landmarks.rows(record_id, points))
 
     return {
-        "session_id": record.id.hex,
-        "frontal_risk": frontal_risk,
-        "sagittal_risk": sagittal_risk,
-        "overall_risk": overall_risk,
-        "explanation": explanation,
+        "session_id": record_id.hex,
+        **assessment,
         "metrics": {
             "back": back_metrics,
             "side": side_metrics,
+            "timing": timing,
         },
     }
 
 
+# --------------------------------------------------
+# BATCH ANALYZE (WHOLE-CLASS INTAKE)
+# --------------------------------------------------
+async def _analyze_waiting(back_bytes: bytes, side_bytes: bytes):
+    # Очередь занята другими запросами — пакет ждёт свободного места,
+    # а не отдаёт элементам 503 «Сервер перегружен»
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + BATCH_QUEUE_WAIT
+    delay = 0.1
+    while True:
+        try:
+            return await analyze_views(back_bytes, side_bytes)
+        except AnalysisError as e:
+            if not isinstance(e.__cause__, workers.QueueFull):
+                raise
+            if loop.time() + delay > deadline:
+                raise
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 2.0)
+
+
+@app.post("/analyze/batch")
+async def analyze_batch(
+    user_ids: List[str] = Form(...),
+    back_photos: List[UploadFile] = File(...),
+    side_photos: List[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+):
+    if not len(user_ids) == len(back_photos) == len(side_photos):
+        raise HTTPException(
+            status_code=400,
+            detail="Количество user_ids, фото со спины и фото сбоку должно совпадать",
+        )
+
+    if len(user_ids) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Не более {BATCH_MAX_ITEMS} обследований за один запрос",
+        )
+
+    # Не больше BATCH_CONCURRENCY пар одновременно в пуле воркеров
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def process(index: int):
+        back_photo, side_photo = back_photos[index], side_photos[index]
+
+        if back_photo.content_type not in ("image/jpeg", "image/png"):
+            raise AnalysisError(400, "Неверный формат фото со спины")
+        if side_photo.content_type not in ("image/jpeg", "image/png"):
+            raise AnalysisError(400, "Неверный формат фото сбоку")
+
+        try:
+            user_uuid = uuid.UUID(user_ids[index])
+        except ValueError:
+            raise AnalysisError(400, "Invalid user_id")
+
+        async with semaphore:
+            back_bytes = await read_upload(back_photo, "со спины")
+            side_bytes = await read_upload(side_photo, "сбоку")
+            back_metrics, side_metrics, timing, points = await _analyze_waiting(
+                back_bytes, side_bytes
+            )
+
+        return user_uuid, back_metrics, side_metrics, timing, points
+
+    outcomes = await asyncio.gather(
+        *(process(i) for i in range(len(user_ids))),
+        return_exceptions=True,
+    )
+
+    # ---------- SAVE TO DB (ONE TRANSACTION) ----------
+    items = []
+    records = []
+    landmark_rows = []
+
+    requested = {o[0] for o in outcomes if not isinstance(o, BaseException)}
+    known = await asyncio.to_thread(_existing_users, db, requested)
+
+    for index, outcome in enumerate(outcomes):
+        if isinstance(outcome, BaseException):
+            if not isinstance(outcome, AnalysisError):
+                outcome = AnalysisError(500, f"Ошибка анализа: {outcome}")
+            items.append(
+                {
+                    "index": index,
+                    "status_code": outcome.status_code,
+                    "error": outcome.detail,
+                }
+            )
+            continue
+
+        user_uuid, back_metrics, side_metrics, timing, points = outcome
+        if user_uuid not in known:
+            items.append(
+                {"index": index, "status_code": 404, "error": "User not found"}
+            )
+            continue
+
+        assessment = assess(back_metrics, side_metrics)
+        # id генерируется здесь, чтобы не перечитывать строки после commit
+        record_id = uuid.uuid4()
+        records.append(
+            Screening.from_assessment(
+                user_uuid, assessment, back_metrics, side_metrics, id=record_id
+            )
+        )
+        landmark_rows.extend(landmarks.rows(record_id, points))
+        items.append(
+            {
+                "index": index,
+                "status_code": 200,
+                "session_id": record_id.hex,
+                **assessment,
+                "metrics": {
+                    "back": back_metrics,
+                    "side": side_metrics,
+                    "timing": timing,
+                },
+            }
+        )
+
+    await asyncio.to_thread(_save, db, records, landmark_rows)
+
+    return {
+        "total": len(items),
+        "succeeded": len(records),
+        "failed": len(items) - len(records),
+        "items": items,
+    }
+
+
+# --------------------------------------------------
+# ANALYSIS JOBS (ASYNC MODE)
+# --------------------------------------------------
+@app.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=60),
+):
+    try:
+        job_uuid = uuid.UUID(job_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid job_id")
+
+    job = await jobs.get(job_uuid, wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
 # --------------------------------------------------
 # USER AUTH — ANONYMOUS
 # --------------------------------------------------
@@ -121,76 +538,173 @@ class AnonymousAuthRequest(BaseModel):
 
 
 @app.post("/auth/anonymous")
-def anonymous_auth(payload: AnonymousAuthRequest):
-    db = SessionLocal()
-    try:
-        user = User(
-            email=payload.email,
-            role="parent",
+def anonymous_auth(payload: AnonymousAuthRequest, db: Session = Depends(get_db)):
+    user = User(
+        id=uuid.uuid4(),
+        email=payload.email,
+        role="parent",
+    )
+    db.add(user)
+    db.commit()
+
+    return {
+        "user_id": user.id.hex,
+        "email": payload.email,
+        "role": "parent",
+    }
+
+
+# --------------------------------------------------
+# LISTING HELPERS
+# --------------------------------------------------
+
+# Тяжёлые JSONB-колонки отдаются только по запросу: ?fields=metrics,explanation
+OPTIONAL_FIELDS = {
+    "ruleset_version": Screening.ruleset_version,
+    "metrics": Screening.metrics,
+    "explanation": Screening.explanation,
+}
+
+
+def _optional_fields(fields: Optional[str]) -> list:
+    if not fields:
+        return []
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in OPTIONAL_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown fields: {', '.join(unknown)}"
         )
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-
-        return {
-            "user_id": user.id.hex,
-            "email": user.email,
-            "role": user.role,
-        }
-    finally:
-        db.close()
+    return names
+
+
+def _listing_response(items: list, next_cursor: Optional[str]):
+    # orjson напрямую, минуя jsonable_encoder
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return ORJSONResponse(items, headers=headers)
 
 
 # --------------------------------------------------
 # USER HISTORY
 # --------------------------------------------------
-@app.get("/history/{user_id}")
-def get_history(user_id: str):
+@app.get("/history/{user_id}", response_class=ORJSONResponse)
+def get_history(
+    user_id: str,
+    limit: int = Query(100, ge=1, le=500),
+    after: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+):
     try:
         user_uuid = uuid.UUID(user_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid user_id")
 
-    db = SessionLocal()
+    extra = _optional_fields(fields)
+
+    # Только нужные колонки, без сборки ORM-объектов
+    query = db.query(
+        Screening.id,
+        Screening.created_at,
+        Screening.overall_risk,
+        Screening.frontal_risk,
+        Screening.sagittal_risk,
+        *(OPTIONAL_FIELDS[name] for name in extra),
+    ).filter(Screening.user_id == user_uuid)
+
     try:
-        records = (
-            db.query(Screening)
-            .filter(Screening.user_id == user_uuid)
-            .order_by(Screening.created_at.desc())
-            .all()
-        )
+        rows, next_cursor = paginate(query, Screening, limit, after)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-        return [
-            {
-                "date": r.created_at.isoformat(),
-                "overall_risk": r.overall_risk,
-                "frontal_risk": r.frontal_risk,
-                "sagittal_risk": r.sagittal_risk,
-            }
-            for r in records
-        ]
-    finally:
-        db.close()
+    items = []
+    for r in rows:
+        item = {
+            "date": r.created_at.isoformat(),
+            "overall_risk": r.overall_risk,
+            "frontal_risk": r.frontal_risk,
+            "sagittal_risk": r.sagittal_risk,
+        }
+        for name in extra:
+            item[name] = r._mapping[name]
+        items.append(item)
+
+    return _listing_response(items, next_cursor)
 
 
 # --------------------------------------------------
 # DOCTOR DASHBOARD (READ ONLY)
 # --------------------------------------------------
-@app.get("/doctor/screenings")
-def doctor_screenings():
-    db = SessionLocal()
+@app.get("/doctor/screenings", response_class=ORJSONResponse)
+def doctor_screenings(
+    limit: int = Query(100, ge=1, le=500),
+    after: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+):
+    extra = _optional_fields(fields)
+
+    query = db.query(
+        Screening.id,
+        Screening.created_at,
+        Screening.overall_risk,
+        Screening.user_id,
+        *(OPTIONAL_FIELDS[name] for name in extra),
+    )
+
     try:
-        records = (
-            db.query(Screening).order_by(Screening.created_at.desc()).limit(100).all()
-        )
+        rows, next_cursor = paginate(query, Screening, limit, after)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-        return [
-            {
-                "date": r.created_at.isoformat(),
-                "overall_risk": r.overall_risk,
-                "user_id": r.user_id.hex,
-            }
-            for r in records
-        ]
-    finally:
-        db.close()
+    items = []
+    for r in rows:
+        item = {
+            "date": r.created_at.isoformat(),
+            "overall_risk": r.overall_risk,
+            "user_id": r.user_id.hex,
+        }
+        for name in extra:
+            item[name] = r._mapping[name]
+        items.append(item)
+
+    return _listing_response(items, next_cursor)
+
+
+@app.get("/doctor/screenings/export")
+def export_screenings(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None),
+    risk: Optional[List[str]] = Query(None),
+):
+    filters = {"date_from": date_from, "date_to": date_to, "risk": risk}
+    stamp = datetime.utcnow().strftime("%Y%m%d")
+
+    if format == "csv":
+        body, media_type = iter_csv(**filters), "text/csv; charset=utf-8"
+    else:
+        body, media_type = iter_ndjson(**filters), "application/x-ndjson"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="screenings_{stamp}.{format}"'
+        },
+    )
+
+
+@app.get("/doctor/stats")
+def doctor_stats(
+    period: str = Query("day", pattern="^(day|week)$"),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    db: Session = Depends(get_db),
+):
+    date_to = date_to or datetime.utcnow().date()
+    date_from = date_from or date_to - timedelta(days=90)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from is after date_to")
+
+    return stats.summary(db, period, date_from, date_to)
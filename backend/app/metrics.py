@@ -0,0 +1,128 @@
+from dataclasses import dataclass
+
+import numpy as np
+from mediapipe.python.solutions.pose import PoseLandmark
+
+# -------------------------
+# LANDMARK ARRAYS
+# -------------------------
+# Одна поза — массив (33, 4): x, y, z, visibility в нормированных координатах.
+# Серия кадров или пакет — (N, 33, 4); все метрики считаются сразу для всех N.
+
+LANDMARK_COUNT = 33
+X, Y, Z, VISIBILITY = range(4)
+
+
+def landmarks_to_array(pose_landmarks) -> np.ndarray:
+    return np.array(
+        [(p.x, p.y, p.z, p.visibility) for p in pose_landmarks.landmark],
+        dtype=np.float32,
+    )
+
+
+# -------------------------
+# METRIC REGISTRY
+# -------------------------
+@dataclass(frozen=True)
+class Metric:
+    name: str
+    view: str
+    landmarks: tuple
+    fn: object
+    digits: int = 3
+
+
+REGISTRY = {"back": [], "side": []}
+
+
+def metric(name: str, view: str, landmarks: tuple, digits: int = 3):
+    # fn(lm, aspect) -> массив (...,) для lm формы (..., 33, 4)
+    def register(fn):
+        REGISTRY[view].append(Metric(name, view, tuple(landmarks), fn, digits))
+        return fn
+
+    return register
+
+
+def landmarks_used(view: str) -> list:
+    return sorted({int(i) for m in REGISTRY[view] for i in m.landmarks})
+
+
+def compute(view: str, lm: np.ndarray, aspect: float = 1.0) -> dict:
+    return {m.name: m.fn(lm, aspect) for m in REGISTRY[view]}
+
+
+def rounded(view: str, values: dict) -> dict:
+    return {m.name: round(float(values[m.name]), m.digits) for m in REGISTRY[view]}
+
+
+def _tilt(lm, a: int, b: int, aspect: float):
+    # Угол линии a–b к горизонту в градусах; x приводится к масштабу y,
+    # иначе на неквадратном кадре угол искажается
+    dx = (lm[..., b, X] - lm[..., a, X]) * aspect
+    dy = lm[..., b, Y] - lm[..., a, Y]
+    return np.degrees(np.arctan2(np.abs(dy), np.abs(dx)))
+
+
+# =========================
+# BACK VIEW (FRONTAL PLANE)
+# =========================
+LS, RS = PoseLandmark.LEFT_SHOULDER, PoseLandmark.RIGHT_SHOULDER
+LH, RH = PoseLandmark.LEFT_HIP, PoseLandmark.RIGHT_HIP
+LE, RE = PoseLandmark.LEFT_EAR, PoseLandmark.RIGHT_EAR
+
+
+@metric("shoulder_diff", "back", (LS, RS))
+def shoulder_diff(lm, aspect):
+    return np.abs(lm[..., LS, Y] - lm[..., RS, Y])
+
+
+@metric("hip_diff", "back", (LH, RH))
+def hip_diff(lm, aspect):
+    return np.abs(lm[..., LH, Y] - lm[..., RH, Y])
+
+
+@metric("shoulder_angle", "back", (LS, RS), digits=1)
+def shoulder_angle(lm, aspect):
+    return _tilt(lm, LS, RS, aspect)
+
+
+@metric("hip_tilt", "back", (LH, RH), digits=1)
+def hip_tilt(lm, aspect):
+    return _tilt(lm, LH, RH, aspect)
+
+
+@metric("head_tilt", "back", (LE, RE), digits=1)
+def head_tilt(lm, aspect):
+    return _tilt(lm, LE, RE, aspect)
+
+
+# =========================
+# SIDE VIEW (SAGITTAL PLANE)
+# =========================
+NOSE = PoseLandmark.NOSE
+R_EAR = PoseLandmark.RIGHT_EAR
+R_SHOULDER = PoseLandmark.RIGHT_SHOULDER
+R_HIP = PoseLandmark.RIGHT_HIP
+R_ANKLE = PoseLandmark.RIGHT_ANKLE
+
+
+@metric("forward_head", "side", (NOSE, R_SHOULDER))
+def forward_head(lm, aspect):
+    return np.abs(lm[..., NOSE, X] - lm[..., R_SHOULDER, X])
+
+
+@metric("trunk_lean", "side", (R_SHOULDER, R_ANKLE))
+def trunk_lean(lm, aspect):
+    return np.abs(lm[..., R_SHOULDER, X] - lm[..., R_ANKLE, X])
+
+
+@metric("plumb_offset", "side", (R_EAR, R_ANKLE))
+def plumb_offset(lm, aspect):
+    # Отклонение уха от отвесной линии через лодыжку
+    return np.abs(lm[..., R_EAR, X] - lm[..., R_ANKLE, X])
+
+
+@metric("hip_offset", "side", (R_HIP, R_ANKLE))
+def hip_offset(lm, aspect):
+    return np.abs(lm[..., R_HIP, X] - lm[..., R_ANKLE, X])
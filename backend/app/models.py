@@ -1,11 +1,26 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, Text, DateTime, ForeignKey, func
+from sqlalchemy import (
+    Column,
+    Text,
+    Date,
+    DateTime,
+    ForeignKey,
+    Float,
+    Integer,
+    LargeBinary,
+    Index,
+    JSON,
+    func,
+)
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 
 from app.db import Base
 
+# В Postgres — JSONB; SQLite (бенчмарки, локальные прогоны) понимает только JSON
+JSONB_COMPAT = JSONB().with_variant(JSON(), "sqlite")
+
 
 class User(Base):
     __tablename__ = "users"
@@ -33,5 +48,102 @@ class Screening(Base):
     sagittal_risk = Column(Text, nullable=False)
     overall_risk = Column(Text, nullable=False)
 
-    metrics = Column(JSONB, nullable=False)
-    explanation = Column(JSONB, nullable=False)
+    # Версия набора правил app.risk, по которой получены уровни риска
+    ruleset_version = Column(Text, nullable=False, server_default="1")
+
+    metrics = Column(JSONB_COMPAT, nullable=False)
+    explanation = Column(JSONB_COMPAT, nullable=False)
+
+    # Под /history/{user_id} и /doctor/screenings (keyset-пагинация)
+    __table_args__ = (
+        Index(
+            "ix_screenings_user_created",
+            user_id,
+            created_at.desc(),
+            id.desc(),
+        ),
+        Index(
+            "ix_screenings_created",
+            created_at.desc(),
+            id.desc(),
+        ),
+    )
+
+    @classmethod
+    def from_assessment(cls, user_id, assessment, back_metrics, side_metrics, **kw):
+        return cls(
+            user_id=user_id,
+            frontal_risk=assessment["frontal_risk"],
+            sagittal_risk=assessment["sagittal_risk"],
+            overall_risk=assessment["overall_risk"],
+            ruleset_version=assessment["ruleset_version"],
+            metrics={
+                "back": back_metrics,
+                "side": side_metrics,
+            },
+            explanation=assessment["explanation"],
+            **kw,
+        )
+
+
+class AnalysisJob(Base):
+    __tablename__ = "analysis_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    user_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id"),
+        nullable=False,
+    )
+
+    # queued → running → done | failed
+    status = Column(Text, nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+
+    # Фото хранятся до завершения задачи, чтобы рестарт не терял работу
+    back_photo = Column(LargeBinary, nullable=False)
+    side_photo = Column(LargeBinary, nullable=False)
+
+    screening_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("screenings.id"),
+        nullable=True,
+    )
+    status_code = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (Index("ix_analysis_jobs_status_created", "status", "created_at"),)
+
+
+class ScreeningStatDaily(Base):
+    __tablename__ = "screening_stats_daily"
+
+    # Счётчики обследований за день по плоскости (overall/frontal/sagittal)
+    # и уровню риска; обновляются вместе со вставкой Screening
+    day = Column(Date, primary_key=True)
+    dimension = Column(Text, primary_key=True)
+    risk = Column(Text, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class ScreeningLandmarks(Base):
+    __tablename__ = "screening_landmarks"
+
+    # Все 33 точки позы (x, y, z, visibility) одного ракурса в виде упакованного
+    # массива (frames, 33, 4) — новые метрики считаются без повторного инференса
+    screening_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("screenings.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    view = Column(Text, primary_key=True)
+
+    frames = Column(Integer, nullable=False, default=1)
+    dtype = Column(Text, nullable=False)
+    # Ширина / высота кадра — для метрик-углов
+    aspect = Column(Float, nullable=False)
+    data = Column(LargeBinary, nullable=False)
@@ -0,0 +1,46 @@
+import base64
+import uuid
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+# -------------------------
+# KEYSET (CURSOR) PAGINATION
+# -------------------------
+# Курсор — последняя отданная пара (created_at, id); следующая страница
+# начинается строго после неё, без OFFSET и без сканирования пропущенных строк
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, record_id: uuid.UUID) -> str:
+    raw = f"{created_at.isoformat()}|{record_id.hex}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, record_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(record_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def paginate(query, model, limit: int, after: str = None):
+    # Новые записи первыми; id разрешает совпадения created_at
+    if after:
+        created_at, record_id = decode_cursor(after)
+        query = query.filter(
+            tuple_(model.created_at, model.id) < tuple_(created_at, record_id)
+        )
+
+    rows = (
+        query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
@@ -0,0 +1,163 @@
+import asyncio
+import os
+import time
+
+from app import telemetry, workers
+from app.cache import make_key, result_cache
+
+# app.analysis (cv2, mediapipe) импортируется внутри функций: API стартует
+# и отвечает на /health, пока модели прогреваются в фоне
+
+# -------------------------
+# CONFIG
+# -------------------------
+
+# Максимальное время анализа одного ракурса (секунды), включая ожидание воркера
+VIEW_TIMEOUT = float(os.getenv("VIEW_TIMEOUT", "60"))
+
+# То же для видео / серии кадров
+VIDEO_VIEW_TIMEOUT = float(os.getenv("VIDEO_VIEW_TIMEOUT", "180"))
+
+
+class AnalysisError(Exception):
+    def __init__(self, status_code: int, detail: str, headers: dict = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.headers = headers
+
+
+async def _cache_call(fn, *args):
+    # Файл SQLite (RESULT_CACHE_PATH) читается и пишется в потоке,
+    # чтобы ожидание его блокировки не останавливало цикл событий
+    if result_cache.store is None:
+        return fn(*args)
+    return await asyncio.to_thread(fn, *args)
+
+
+async def _timed(fn, payload, timeout: float, key: str = None):
+    start = time.perf_counter()
+
+    # Повторная отправка того же фото не запускает инференс заново
+    result = await _cache_call(result_cache.get, key) if key else None
+    cached = result is not None
+
+    if not cached:
+        result = await asyncio.wait_for(workers.run(fn, payload), timeout)
+        if key:
+            await _cache_call(result_cache.set, key, result)
+
+    return result, round((time.perf_counter() - start) * 1000, 1), cached
+
+
+def _view_error(view: str, exc: BaseException) -> AnalysisError:
+    # analysis к этому моменту уже загружен — тяжёлый импорт не здесь
+    from app.analysis import VIEW_LABELS
+
+    if isinstance(exc, workers.NotReady):
+        return AnalysisError(
+            503,
+            "Сервис запускается, повторите попытку позже",
+            {"Retry-After": str(workers.ANALYSIS_RETRY_AFTER)},
+        )
+    if isinstance(exc, workers.QueueFull):
+        return AnalysisError(
+            503,
+            "Сервер перегружен, повторите попытку позже",
+            {"Retry-After": str(workers.ANALYSIS_RETRY_AFTER)},
+        )
+    if isinstance(exc, asyncio.TimeoutError):
+        return AnalysisError(504, f"Превышено время анализа ({VIEW_LABELS[view]})")
+    if isinstance(exc, ValueError):
+        return AnalysisError(422, str(exc))
+    return AnalysisError(500, f"Ошибка анализа ({VIEW_LABELS[view]}): {exc}")
+
+
+# =========================
+# BACK + SIDE IN PARALLEL
+# =========================
+async def _run_views(back, side):
+    from app.analysis import PoseNotFound
+
+    start = time.perf_counter()
+
+    # Ракурсы независимы — запускаем одновременно
+    outcomes = await asyncio.gather(
+        _timed(*back),
+        _timed(*side),
+        return_exceptions=True,
+    )
+
+    errors = []
+    for view, outcome in zip(("back", "side"), outcomes):
+        if isinstance(outcome, BaseException):
+            error = _view_error(view, outcome)
+            if isinstance(outcome, PoseNotFound):
+                telemetry.pose_failures.inc(view)
+            telemetry.analysis_errors.inc(view, str(error.status_code))
+            errors.append((error, outcome))
+            continue
+
+        result, ms, cached = outcome
+        telemetry.observe("view", ms / 1000, view)
+        if not cached:
+            telemetry.observe_analysis(view, result)
+
+    if errors:
+        error, outcome = errors[0]
+        raise error from outcome
+
+    back_metrics, back_ms, back_cached = outcomes[0]
+    side_metrics, side_ms, side_cached = outcomes[1]
+
+    timing = {
+        "back_ms": back_ms,
+        "side_ms": side_ms,
+        "total_ms": round((time.perf_counter() - start) * 1000, 1),
+        "cached": {"back": back_cached, "side": side_cached},
+    }
+
+    # Диагностика этапов — только в ответ, не в сохраняемые metrics;
+    # у результата из кэша она от прошлого запуска и отбрасывается
+    back_preprocess = back_metrics.pop("preprocess", None)
+    side_preprocess = side_metrics.pop("preprocess", None)
+    timing["preprocess"] = {
+        "back": None if back_cached else back_preprocess,
+        "side": None if side_cached else side_preprocess,
+    }
+
+    # Сырые landmarks сохраняются отдельно (screening_landmarks), не в metrics
+    landmarks = {
+        "back": back_metrics.pop("landmarks", None),
+        "side": side_metrics.pop("landmarks", None),
+    }
+    return back_metrics, side_metrics, timing, landmarks
+
+
+async def analyze_views(back_bytes: bytes, side_bytes: bytes):
+    from app import analysis
+
+    return await _run_views(
+        (
+            analysis.analyze_back_photo,
+            back_bytes,
+            VIEW_TIMEOUT,
+            make_key("back", analysis.cache_params("back"), back_bytes),
+        ),
+        (
+            analysis.analyze_side_photo,
+            side_bytes,
+            VIEW_TIMEOUT,
+            make_key("side", analysis.cache_params("side"), side_bytes),
+        ),
+    )
+
+
+async def analyze_frames(back_blobs: list, side_blobs: list):
+    from app import analysis
+
+    # Видео / серия кадров: трекинг по всем кадрам, без кэша результатов
+    return await _run_views(
+        (analysis.analyze_back_frames, back_blobs, VIDEO_VIEW_TIMEOUT),
+        (analysis.analyze_side_frames, side_blobs, VIDEO_VIEW_TIMEOUT),
+    )
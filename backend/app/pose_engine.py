@@ -0,0 +1,217 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# -------------------------
+# CONFIG
+# -------------------------
+
+# Максимальное число моделей Pose на один ключ (complexity, confidence, static)
+POSE_POOL_SIZE = int(os.getenv("POSE_POOL_SIZE", str(os.cpu_count() or 2)))
+
+# Сколько секунд запрос ждёт свободную модель, прежде чем упасть
+POSE_CHECKOUT_TIMEOUT = float(os.getenv("POSE_CHECKOUT_TIMEOUT", "30"))
+
+# Сколько моделей каждого варианта создать заранее при старте
+POSE_WARMUP_COUNT = int(os.getenv("POSE_WARMUP_COUNT", "1"))
+
+
+# Пустой кадр для прогона модели при прогреве
+_WARMUP_FRAME = np.zeros((256, 256, 3), dtype=np.uint8)
+
+
+class PoolTimeout(RuntimeError):
+    pass
+
+
+# =========================
+# POSE POOL
+# =========================
+class PosePool:
+    def __init__(
+        self, complexity: int, confidence: float, size: int, static: bool = True
+    ):
+        self.complexity = complexity
+        self.confidence = confidence
+        self.static = static
+        self.size = max(1, size)
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+
+        self.created = 0
+        self.in_use = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.init_seconds = 0.0
+
+    def _create(self):
+        # Ленивый импорт: mediapipe грузится при прогреве, а не при импорте API
+        from mediapipe.python.solutions import pose as mp_pose
+
+        start = time.perf_counter()
+        pose = mp_pose.Pose(
+            static_image_mode=self.static,
+            model_complexity=self.complexity,
+            enable_segmentation=False,
+            min_detection_confidence=self.confidence,
+        )
+        with self._lock:
+            self.init_seconds += time.perf_counter() - start
+        return pose
+
+    def _acquire(self, timeout: float):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self.created < self.size
+            if can_create:
+                self.created += 1
+
+        if can_create:
+            try:
+                return self._create()
+            except Exception:
+                with self._lock:
+                    self.created -= 1
+                raise
+
+        with self._lock:
+            self.waits += 1
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                self.timeouts += 1
+            raise PoolTimeout(
+                f"Нет свободной модели Pose (complexity={self.complexity})"
+            )
+
+    @contextmanager
+    def checkout(self, timeout: float = None):
+        pose = self._acquire(POSE_CHECKOUT_TIMEOUT if timeout is None else timeout)
+        if not self.static:
+            # Режим трекинга хранит состояние между кадрами — сбрасываем
+            # его, чтобы новый ролик не продолжал трек предыдущего
+            pose.reset()
+        with self._lock:
+            self.in_use += 1
+            self.checkouts += 1
+
+        try:
+            yield pose
+        except Exception as exc:
+            self._release(pose, broken=not isinstance(exc, ValueError))
+            raise
+        else:
+            self._release(pose, broken=False)
+
+    def _release(self, pose, broken: bool):
+        with self._lock:
+            self.in_use -= 1
+            if broken:
+                # Граф мог остаться в неконсистентном состоянии — пересоздадим
+                self.errors += 1
+                self.created -= 1
+        if broken:
+            pose.close()
+        else:
+            self._idle.put(pose)
+
+    def warmup(self, count: int = None):
+        count = self.size if count is None else min(count, self.size)
+        while True:
+            with self._lock:
+                if self.created >= count:
+                    return
+                self.created += 1
+            try:
+                pose = self._create()
+                # Первый process() инициализирует граф и TFLite-интерпретатор —
+                # платим за это при прогреве, а не на первом запросе
+                pose.process(_WARMUP_FRAME)
+                if not self.static:
+                    pose.reset()
+                self._idle.put(pose)
+            except Exception:
+                with self._lock:
+                    self.created -= 1
+                raise
+
+    def close(self):
+        while True:
+            try:
+                pose = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            pose.close()
+            with self._lock:
+                self.created -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "complexity": self.complexity,
+                "confidence": self.confidence,
+                "static": self.static,
+                "size": self.size,
+                "created": self.created,
+                "idle": self._idle.qsize(),
+                "in_use": self.in_use,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "errors": self.errors,
+                "init_ms": round(self.init_seconds * 1000, 1),
+            }
+
+
+# =========================
+# POOL REGISTRY
+# =========================
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(complexity: int, confidence: float = 0.5, static: bool = True) -> PosePool:
+    key = (complexity, confidence, static)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = PosePool(complexity, confidence, POSE_POOL_SIZE, static)
+                _pools[key] = pool
+    return pool
+
+
+def checkout(
+    complexity: int,
+    confidence: float = 0.5,
+    timeout: float = None,
+    static: bool = True,
+):
+    return get_pool(complexity, confidence, static).checkout(timeout)
+
+
+def warmup(variants, count: int = POSE_WARMUP_COUNT, static: bool = True):
+    for complexity, confidence in variants:
+        get_pool(complexity, confidence, static).warmup(count)
+
+
+def stats() -> list:
+    return [pool.stats() for pool in list(_pools.values())]
+
+
+def shutdown():
+    for pool in list(_pools.values()):
+        pool.close()
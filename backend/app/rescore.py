@@ -0,0 +1,172 @@
+import json
+import os
+
+import numpy as np
+from sqlalchemy import Text, cast, func, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+
+from app import risk, stats
+from app.models import Screening
+
+# -------------------------
+# BULK RE-SCORING
+# -------------------------
+# Пересчёт уровней риска и пояснений сохранённых обследований по другому
+# набору правил. Метрики читаются из JSON прямо в SQL (только нужные поля),
+# классификация — на массивах NumPy целиком для пачки строк.
+# Правила применяются к сохранённым (округлённым) метрикам — анализ тоже
+# считает уровни и пояснения по округлённым, поэтому пересчёт тем же набором
+# правил ничего не меняет
+
+# Сколько обследований читается и обновляется за одну транзакцию
+RESCORE_CHUNK_SIZE = int(os.getenv("RESCORE_CHUNK_SIZE", "5000"))
+
+
+def _columns(ruleset: risk.RuleSet) -> list:
+    # (view, metric) — всё, что нужно набору для уровней и пояснений
+    names = [("back", name) for name in ruleset.frontal.metrics]
+    names += [("side", name) for name in ruleset.sagittal.metrics]
+    names += [
+        (view, rule.metric)
+        for view in ("back", "side")
+        for rule in ruleset.explanations[view]
+    ]
+    return list(dict.fromkeys(names))
+
+
+def _explanations(ruleset: risk.RuleSet, flags) -> dict:
+    # flags — сработавшие правила пояснений: сначала back, затем side
+    explanations = {}
+    offset = 0
+    for view in ("back", "side"):
+        rules = ruleset.explanations[view]
+        found = [r.message for r, hit in zip(rules, flags[offset:]) if hit]
+        explanations[view] = found or [risk.NO_FINDINGS[view]]
+        offset += len(rules)
+    return explanations
+
+
+def _metrics_with(db, explanations: dict):
+    # Пояснения ракурсов лежат и внутри metrics — меняются в SQL, без чтения
+    # документа в Python
+    if db.get_bind().dialect.name == "postgresql":
+        value = Screening.metrics
+        for view, explanation in explanations.items():
+            value = func.jsonb_set(
+                value,
+                cast([view, "explanation"], ARRAY(Text)),
+                cast(explanation, JSONB),
+            )
+        return value
+
+    # SQLite (бенчмарки, локальные прогоны)
+    args = []
+    for view, explanation in explanations.items():
+        args += [f"$.{view}.explanation", func.json(json.dumps(explanation))]
+    return func.json_set(Screening.metrics, *args)
+
+
+def classify(ruleset: risk.RuleSet, values: dict) -> tuple:
+    # values: (view, metric) → массив (N,); возвращает уровни (N,) и флаги (N, k)
+    back = {name: v for (view, name), v in values.items() if view == "back"}
+    side = {name: v for (view, name), v in values.items() if view == "side"}
+
+    frontal = risk.plane_level(ruleset.frontal, back)
+    sagittal = risk.plane_level(ruleset.sagittal, side)
+    overall = np.maximum(frontal, sagittal)
+
+    flags = np.stack(
+        [
+            (back if view == "back" else side)[rule.metric] > rule.threshold
+            for view in ("back", "side")
+            for rule in ruleset.explanations[view]
+        ],
+        axis=1,
+    )
+    return frontal, sagittal, overall, flags
+
+
+def _rescore_chunk(db, ruleset, columns, rows) -> tuple:
+    ids = np.array([r[0] for r in rows], dtype=object)
+    old = np.array(
+        [[risk.LEVELS.index(label) for label in r[1:4]] for r in rows], dtype=np.int8
+    )
+    matrix = np.array([r[4:] for r in rows], dtype=np.float64)
+
+    # Записи без нужных метрик (старый формат) не трогаем
+    valid = ~np.isnan(matrix).any(axis=1)
+    ids, old, matrix = ids[valid], old[valid], matrix[valid]
+    if not len(ids):
+        return 0, 0, int((~valid).sum())
+
+    values = {column: matrix[:, i] for i, column in enumerate(columns)}
+    frontal, sagittal, overall, flags = classify(ruleset, values)
+
+    new = np.stack([frontal, sagittal, overall], axis=1)
+    changed = int((new != old).any(axis=1).sum())
+
+    # Одинаковый результат → один UPDATE ... WHERE id IN (...):
+    # комбинаций уровней и пояснений немного, строк — тысячи
+    bits = flags.astype(np.int64) @ (1 << np.arange(flags.shape[1], dtype=np.int64))
+    key = (frontal.astype(np.int64) * 3 + sagittal) << flags.shape[1] | bits
+    _, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+
+    for group, index in enumerate(first):
+        explanations = _explanations(ruleset, flags[index])
+        db.execute(
+            update(Screening)
+            .where(Screening.id.in_(ids[inverse == group].tolist()))
+            .values(
+                frontal_risk=risk.LEVELS[frontal[index]],
+                sagittal_risk=risk.LEVELS[sagittal[index]],
+                overall_risk=risk.LEVELS[overall[index]],
+                explanation=[
+                    *explanations["back"],
+                    *explanations["side"],
+                    risk.DISCLAIMER,
+                ],
+                metrics=_metrics_with(db, explanations),
+                ruleset_version=ruleset.version,
+            )
+            .execution_options(synchronize_session=False)
+        )
+    return len(ids), changed, int((~valid).sum())
+
+
+def rescore(db, version: str = None, chunk_size: int = RESCORE_CHUNK_SIZE, force=False):
+    ruleset = risk.get_ruleset(version)
+    columns = _columns(ruleset)
+
+    query = select(
+        Screening.id,
+        Screening.frontal_risk,
+        Screening.sagittal_risk,
+        Screening.overall_risk,
+        *[Screening.metrics[column].as_float() for column in columns],
+    ).order_by(Screening.id)
+    if not force:
+        # Повторный запуск продолжает с необработанных записей
+        query = query.where(Screening.ruleset_version != ruleset.version)
+
+    totals = {"rescored": 0, "changed": 0, "skipped": 0}
+    last_id = None
+    while True:
+        # Keyset по id: каждая пачка — отдельная короткая транзакция
+        chunk = query if last_id is None else query.where(Screening.id > last_id)
+        rows = db.execute(chunk.limit(chunk_size)).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        rescored, changed, skipped = _rescore_chunk(db, ruleset, columns, rows)
+        db.commit()
+        totals["rescored"] += rescored
+        totals["changed"] += changed
+        totals["skipped"] += skipped
+
+    # Дневные счётчики считаются по уровням риска — пересобираем их
+    if totals["changed"]:
+        stats.backfill(db)
+
+    totals["ruleset_version"] = ruleset.version
+    return totals
@@ -0,0 +1,163 @@
+import json
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+# -------------------------
+# RISK EVALUATION
+# -------------------------
+# Пороги собраны в версионированные наборы правил. Версия набора хранится
+# в каждом Screening; после смены порогов старые записи пересчитываются
+# скриптом rescore_screenings.py
+
+DISCLAIMER = (
+    "Результат является предварительной оценкой и не заменяет консультацию врача."
+)
+
+LEVELS = ("low", "medium", "high")
+
+
+@dataclass(frozen=True)
+class PlaneRule:
+    # Уровень плоскости — худший из уровней её метрик:
+    # metric < medium → low, metric < high → medium, иначе high
+    metrics: tuple
+    medium: float
+    high: float
+
+
+@dataclass(frozen=True)
+class ExplanationRule:
+    metric: str
+    threshold: float
+    message: str
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    version: str
+    frontal: PlaneRule
+    sagittal: PlaneRule
+    # view → ExplanationRule, сработавшие при metric > threshold
+    explanations: dict
+
+
+NO_FINDINGS = {
+    "back": "Значимых асимметрий не обнаружено",
+    "side": "Значимых отклонений не обнаружено",
+}
+
+RULESETS = {
+    "1": RuleSet(
+        version="1",
+        frontal=PlaneRule(("shoulder_diff", "hip_diff"), 0.03, 0.06),
+        sagittal=PlaneRule(("forward_head", "trunk_lean"), 0.04, 0.07),
+        explanations={
+            "back": (
+                ExplanationRule("shoulder_diff", 0.04, "Обнаружена асимметрия плеч"),
+                ExplanationRule("hip_diff", 0.04, "Обнаружена асимметрия таза"),
+            ),
+            "side": (
+                ExplanationRule("forward_head", 0.06, "Выдвижение головы вперёд"),
+                ExplanationRule("trunk_lean", 0.06, "Отклонение корпуса"),
+            ),
+        },
+    ),
+}
+
+
+def _ruleset_from_dict(data: dict) -> RuleSet:
+    return RuleSet(
+        version=str(data["version"]),
+        frontal=PlaneRule(
+            tuple(data["frontal"]["metrics"]), *data["frontal"]["thresholds"]
+        ),
+        sagittal=PlaneRule(
+            tuple(data["sagittal"]["metrics"]), *data["sagittal"]["thresholds"]
+        ),
+        explanations={
+            view: tuple(ExplanationRule(*rule) for rule in rules)
+            for view, rules in data["explanations"].items()
+        },
+    )
+
+
+def load_rulesets(path: str):
+    # JSON-список наборов правил, подобранных клиницистами, — дополняет встроенные
+    with open(path, encoding="utf-8") as f:
+        for data in json.load(f):
+            ruleset = _ruleset_from_dict(data)
+            RULESETS[ruleset.version] = ruleset
+
+
+def get_ruleset(version: str = None) -> RuleSet:
+    version = version or RISK_RULESET
+    if version not in RULESETS:
+        raise ValueError(f"Unknown risk ruleset: {version}")
+    return RULESETS[version]
+
+
+RISK_RULESETS_FILE = os.getenv("RISK_RULESETS_FILE")
+if RISK_RULESETS_FILE:
+    load_rulesets(RISK_RULESETS_FILE)
+
+# Версия, по которой оцениваются новые обследования
+RISK_RULESET = os.getenv("RISK_RULESET", "1")
+ACTIVE = get_ruleset(RISK_RULESET)
+
+
+# =========================
+# CLASSIFICATION
+# =========================
+def plane_level(rule: PlaneRule, values: dict):
+    # Работает и для чисел, и для массивов (N,) — при пересчёте всей таблицы
+    level = 0
+    for name in rule.metrics:
+        value = np.asarray(values[name], dtype=np.float64)
+        level = np.maximum(
+            level, (value >= rule.medium).astype(np.int8) + (value >= rule.high)
+        )
+    return level
+
+
+def frontal_risk(back_metrics: dict, ruleset: RuleSet = None) -> str:
+    ruleset = ruleset or ACTIVE
+    return LEVELS[int(plane_level(ruleset.frontal, back_metrics))]
+
+
+def sagittal_risk(side_metrics: dict, ruleset: RuleSet = None) -> str:
+    ruleset = ruleset or ACTIVE
+    return LEVELS[int(plane_level(ruleset.sagittal, side_metrics))]
+
+
+def overall_risk(frontal: str, sagittal: str) -> str:
+    return LEVELS[max(LEVELS.index(frontal), LEVELS.index(sagittal))]
+
+
+def explain(view: str, values: dict, ruleset: RuleSet = None) -> list:
+    ruleset = ruleset or ACTIVE
+    explanation = [
+        rule.message
+        for rule in ruleset.explanations[view]
+        if values[rule.metric] > rule.threshold
+    ]
+    return explanation or [NO_FINDINGS[view]]
+
+
+def assess(back_metrics: dict, side_metrics: dict) -> dict:
+    frontal = frontal_risk(back_metrics)
+    sagittal = sagittal_risk(side_metrics)
+
+    explanation = []
+    explanation.extend(back_metrics["explanation"])
+    explanation.extend(side_metrics["explanation"])
+    explanation.append(DISCLAIMER)
+
+    return {
+        "frontal_risk": frontal,
+        "sagittal_risk": sagittal,
+        "overall_risk": overall_risk(frontal, sagittal),
+        "explanation": explanation,
+        "ruleset_version": ACTIVE.version,
+    }
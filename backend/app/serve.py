@@ -0,0 +1,143 @@
+import json
+import os
+import tempfile
+
+import uvicorn
+
+# -------------------------
+# MULTI-WORKER SERVER
+# -------------------------
+# python -m app.serve — несколько процессов uvicorn на одном порту.
+# Модели, пулы и кэш в памяти у каждого процесса свои, поэтому число
+# воркеров подбирается по CPU и памяти, а результаты анализа делятся
+# через общий файл SQLite (RESULT_CACHE_PATH), а метрики /metrics —
+# через общий каталог (METRICS_DIR).
+# Модули app здесь не импортируются: их настройки читаются из окружения
+# при импорте, и воркеры должны получить уже итоговые значения
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+
+# Число воркеров; не задано — по CPU и памяти
+WEB_CONCURRENCY = os.getenv("WEB_CONCURRENCY")
+
+# Память на один воркер с прогретыми моделями (МБ): ~470 МБ после прогрева
+# плюс запас на декодирование больших фото
+WORKER_MEMORY_MB = int(os.getenv("WORKER_MEMORY_MB", "768"))
+
+# Общий кэш результатов по умолчанию, если воркеров больше одного.
+# Хранилище — только ускорение: обращения к нему идут вне event loop, ошибки
+# SQLite (блокировка, нет места) считаются в store_errors и дают промах, а не
+# 500; размер ограничен RESULT_CACHE_TTL и RESULT_CACHE_MAX_ROWS.
+# RESULT_CACHE_PATH= (пустое значение) отключает его
+SHARED_CACHE_PATH = os.path.join(tempfile.gettempdir(), "spine-results.sqlite")
+
+# Общий каталог метрик, если воркеров больше одного: /metrics отвечает
+# случайный воркер, и без суммирования счётчики «прыгали» бы между
+# значениями разных процессов, а Prometheus видел бы в этом сбросы
+SHARED_METRICS_DIR = os.path.join(tempfile.gettempdir(), "spine-metrics")
+
+
+def _read(path: str):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+# =========================
+# RESOURCE LIMITS
+# =========================
+def cpu_limit() -> int:
+    # Доступные процессу ядра с учётом квоты cgroup (лимит CPU контейнера)
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = None
+    v2 = _read("/sys/fs/cgroup/cpu.max")
+    if v2:
+        limit, period = v2.split()
+        if limit != "max":
+            quota = int(limit) / int(period)
+    else:
+        limit = _read("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")
+        period = _read("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+        if limit and period and int(limit) > 0:
+            quota = int(limit) / int(period)
+
+    if quota:
+        cpus = min(cpus, max(1, int(quota)))
+    return max(1, cpus)
+
+
+def memory_limit_mb() -> int:
+    # Лимит памяти контейнера, иначе физическая память машины
+    total = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    for path in (
+        "/sys/fs/cgroup/memory.max",
+        "/sys/fs/cgroup/memory/memory.limit_in_bytes",
+    ):
+        value = _read(path)
+        if value and value.isdigit():
+            # «Без лимита» в cgroup v1 — огромное число
+            total = min(total, int(value))
+            break
+    return total // (1024 * 1024)
+
+
+def worker_count(cpus: int, memory_mb: int) -> int:
+    if WEB_CONCURRENCY:
+        return max(1, int(WEB_CONCURRENCY))
+    return max(1, min(cpus, memory_mb // WORKER_MEMORY_MB))
+
+
+def plan() -> dict:
+    cpus = cpu_limit()
+    memory_mb = memory_limit_mb()
+    workers = worker_count(cpus, memory_mb)
+
+    # Ядра делятся между воркерами: иначе каждый процесс заведёт пул
+    # моделей и потоков на все ядра машины
+    per_worker = str(max(1, cpus // workers))
+    env = {"ANALYSIS_WORKERS": per_worker, "POSE_POOL_SIZE": per_worker}
+    if workers > 1:
+        env["RESULT_CACHE_PATH"] = SHARED_CACHE_PATH
+        env["METRICS_DIR"] = SHARED_METRICS_DIR
+        # Воркер начинает принимать соединения только после прогрева:
+        # пока он грузит модели, запросы уходят к уже готовым
+        env["STARTUP_WARMUP"] = "blocking"
+
+    # Явно заданные переменные окружения важнее расчёта
+    env = {name: os.environ.get(name, value) for name, value in env.items()}
+    return {"workers": workers, "cpus": cpus, "memory_mb": memory_mb, "env": env}
+
+
+def _reset_metrics(path: str):
+    # Значения прошлого запуска не должны попасть в сумму: перезапуск
+    # сервера для Prometheus — обычный сброс счётчиков
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith((".json", ".json.tmp")):
+            os.remove(os.path.join(path, name))
+
+
+def main():
+    config = plan()
+    os.environ.update(config["env"])
+    if config["env"].get("METRICS_DIR"):
+        _reset_metrics(config["env"]["METRICS_DIR"])
+    print(json.dumps(config), flush=True)
+
+    uvicorn.run(
+        "app.main:app",
+        host=HOST,
+        port=PORT,
+        workers=config["workers"],
+    )
+
+
+if __name__ == "__main__":
+    main()
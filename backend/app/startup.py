@@ -0,0 +1,118 @@
+import importlib
+import json
+import os
+import threading
+import time
+
+from app import pose_engine, workers
+
+# -------------------------
+# CONFIG
+# -------------------------
+
+# "background" — API принимает запросы сразу, /health отвечает 503 до прогрева;
+# "blocking" — uvicorn не открывает порт, пока модели не загружены
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "background")
+
+# Тяжёлые модули, время импорта которых попадает в отчёт
+HEAVY_MODULES = ("numpy", "cv2", "mediapipe", "app.analysis")
+
+# Момент импорта этого модуля — первый из модулей app в main.py
+_started = time.perf_counter()
+
+_lock = threading.Lock()
+_state = {
+    "phase": "cold",  # cold → warming → ready | failed
+    "app_import_ms": None,
+    "imports_ms": {},
+    "workers_ms": None,
+    "ready_ms": None,
+    "error": None,
+}
+
+
+def _ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def _set(**values):
+    with _lock:
+        _state.update(values)
+
+
+def imports_done():
+    # Вызывается в конце импортов main.py
+    _set(app_import_ms=_ms(_started))
+
+
+# =========================
+# WARM-UP
+# =========================
+def _import_heavy() -> dict:
+    timings = {}
+    for name in HEAVY_MODULES:
+        start = time.perf_counter()
+        importlib.import_module(name)
+        timings[name] = _ms(start)
+    return timings
+
+
+def warm():
+    _set(phase="warming", error=None)
+    try:
+        _set(imports_ms=_import_heavy())
+
+        # Модели всех вариантов (фото и трекинг) создаются здесь,
+        # а не на первом запросе
+        start = time.perf_counter()
+        workers.start()
+        _set(workers_ms=_ms(start))
+    except Exception as e:
+        _set(phase="failed", error=str(e))
+        raise
+
+    _set(phase="ready", ready_ms=_ms(_started))
+
+
+def is_ready() -> bool:
+    # Пул анализа может пересоздаваться и после прогрева (упавший процесс)
+    return _state["phase"] == "ready" and workers.running()
+
+
+def report() -> dict:
+    with _lock:
+        state = dict(_state)
+    # При нескольких воркерах uvicorn видно, какой процесс ответил
+    state["pid"] = os.getpid()
+    state["models"] = [
+        {
+            "complexity": p["complexity"],
+            "static": p["static"],
+            "created": p["created"],
+            "init_ms": p["init_ms"],
+        }
+        for p in pose_engine.stats()
+    ]
+    return state
+
+
+# =========================
+# IMAGE BUILD PRELOAD
+# =========================
+if __name__ == "__main__":
+    # RUN python -m app.startup в Dockerfile: MediaPipe скачивает файл модели
+    # lite при первом создании Pose — пусть это происходит при сборке образа,
+    # а не при каждом холодном старте контейнера
+    workers.ANALYSIS_EXECUTOR = "thread"
+    warm()
+
+    # Модели всех ступеней каскада, включая heavy: POSE_CASCADE=1 могут
+    # задать только при запуске контейнера, а не при сборке
+    from app import analysis
+
+    pose_engine.warmup(
+        [(c, analysis.BACK_MIN_CONFIDENCE) for c in analysis.POSE_CASCADE_TIERS],
+        count=1,
+    )
+    print(json.dumps(report(), indent=2))
+    workers.shutdown()
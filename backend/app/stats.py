@@ -0,0 +1,116 @@
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.models import Screening, ScreeningStatDaily
+
+# -------------------------
+# RISK STATISTICS (ROLLUPS)
+# -------------------------
+
+DIMENSIONS = {
+    "overall": "overall_risk",
+    "frontal": "frontal_risk",
+    "sagittal": "sagittal_risk",
+}
+
+RISK_LEVELS = ("low", "medium", "high")
+
+
+def _insert(db):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    raise RuntimeError(f"Rollup upsert is not supported for {dialect}")
+
+
+def record(db, screenings):
+    # Вызывается в той же транзакции, что и вставка обследований
+    counts = Counter()
+    for s in screenings:
+        day = (s.created_at or datetime.utcnow()).date()
+        for dimension, column in DIMENSIONS.items():
+            counts[(day, dimension, getattr(s, column))] += 1
+
+    if not counts:
+        return
+
+    table = ScreeningStatDaily.__table__
+    stmt = _insert(db)(table).values(
+        [
+            {"day": day, "dimension": dimension, "risk": risk, "count": n}
+            for (day, dimension, risk), n in counts.items()
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.day, table.c.dimension, table.c.risk],
+        set_={"count": table.c.count + stmt.excluded.count},
+    )
+    db.execute(stmt)
+
+
+def backfill(db) -> int:
+    # Полный пересчёт из screenings — для уже накопленных данных
+    db.query(ScreeningStatDaily).delete(synchronize_session=False)
+
+    day = func.date(Screening.created_at)
+    for dimension, column in DIMENSIONS.items():
+        risk = getattr(Screening, column)
+        db.execute(
+            ScreeningStatDaily.__table__.insert().from_select(
+                ["day", "dimension", "risk", "count"],
+                select(day, literal(dimension), risk, func.count())
+                .where(Screening.created_at.is_not(None))
+                .group_by(day, risk),
+            )
+        )
+    db.commit()
+    return db.query(ScreeningStatDaily).count()
+
+
+def _bucket(day: date, period: str) -> date:
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def summary(db, period: str, date_from: date, date_to: date) -> dict:
+    # Читает только rollup-строки диапазона: время не зависит от размера screenings
+    rows = (
+        db.query(
+            ScreeningStatDaily.day,
+            ScreeningStatDaily.dimension,
+            ScreeningStatDaily.risk,
+            ScreeningStatDaily.count,
+        )
+        .filter(
+            ScreeningStatDaily.day >= date_from,
+            ScreeningStatDaily.day <= date_to,
+        )
+        .all()
+    )
+
+    def empty():
+        return {dim: dict.fromkeys(RISK_LEVELS, 0) for dim in DIMENSIONS}
+
+    series = {}
+    totals = empty()
+    for r in rows:
+        start = _bucket(r.day, period)
+        bucket = series.setdefault(start, empty())
+        bucket[r.dimension][r.risk] = bucket[r.dimension].get(r.risk, 0) + r.count
+        totals[r.dimension][r.risk] = totals[r.dimension].get(r.risk, 0) + r.count
+
+    return {
+        "period": period,
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat(),
+        "totals": totals,
+        "series": [
+            {"start": start.isoformat(), **series[start]} for start in sorted(series)
+        ],
+    }
@@ -0,0 +1,327 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# -------------------------
+# CONFIG
+# -------------------------
+
+# Разбивка по этапам в заголовке Server-Timing (кроме db, который есть всегда)
+SERVER_TIMING_STAGES = os.getenv("SERVER_TIMING_STAGES", "1") == "1"
+
+# Границы корзин гистограмм (секунды)
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Общий каталог метрик нескольких процессов uvicorn (python -m app.serve).
+# Каждый воркер периодически пишет туда свои значения, а /metrics, какой бы
+# воркер ни ответил, суммирует все файлы. Не задан — метрики только процесса
+METRICS_DIR = os.getenv("METRICS_DIR")
+
+# Как часто воркер сбрасывает свои значения в METRICS_DIR (секунды)
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+
+# Этапы для текущего HTTP-запроса: [(stage, view, seconds), ...]
+_request_stages = ContextVar("request_stages", default=None)
+
+_flusher = None
+_stopping = threading.Event()
+
+logger = logging.getLogger(__name__)
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{v}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+# =========================
+# METRIC TYPES
+# =========================
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield self.name, _labels(self.labels, labels), value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets=STAGE_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # labels → [счётчики по корзинам..., +Inf], сумма
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *labels):
+        with self._lock:
+            counts, total = self._values.get(
+                labels, ([0] * (len(self.buckets) + 1), 0.0)
+            )
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self._values[labels] = (counts, total + seconds)
+
+    def samples(self):
+        with self._lock:
+            items = [(k, (list(c), s)) for k, (c, s) in self._values.items()]
+        for labels, (counts, total) in items:
+            cumulative = 0
+            bounds = [str(b) for b in self.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket",
+                    _labels(self.labels + ("le",), labels + (bound,)),
+                    cumulative,
+                )
+            yield f"{self.name}_sum", _labels(self.labels, labels), round(total, 6)
+            yield f"{self.name}_count", _labels(self.labels, labels), cumulative
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), collect=None):
+        # collect() -> [(labels, value), ...], вызывается при каждом опросе
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.collect = collect
+
+    def samples(self):
+        for labels, value in self.collect():
+            yield self.name, _labels(self.labels, labels), value
+
+
+class CollectedCounter(Gauge):
+    # Счётчик, который ведёт другой модуль (воркеры, кэш): значение читается
+    # при опросе, но только растёт — для rate() это counter, а не gauge
+    kind = "counter"
+
+
+REGISTRY = []
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+# =========================
+# HOT-PATH METRICS
+# =========================
+stage_seconds = register(
+    Histogram(
+        "spine_stage_seconds",
+        "Time spent in each stage of /analyze",
+        ("stage", "view"),
+    )
+)
+
+pose_failures = register(
+    Counter(
+        "spine_pose_failures_total",
+        "Photos where no pose was detected",
+        ("view",),
+    )
+)
+
+pose_tiers = register(
+    Counter(
+        "spine_pose_tier_total",
+        "Photos analysed per accepted model complexity",
+        ("view", "complexity"),
+    )
+)
+
+pose_attempts = register(
+    Counter(
+        "spine_pose_attempts_total",
+        "Pose model runs per photo, including cascade escalations",
+        ("view",),
+    )
+)
+
+analysis_errors = register(
+    Counter(
+        "spine_analysis_errors_total",
+        "Failed view analyses by HTTP status",
+        ("view", "status"),
+    )
+)
+
+
+def observe(stage: str, seconds: float, view: str = ""):
+    stage_seconds.observe(seconds, stage, view)
+    stages = _request_stages.get()
+    if stages is not None:
+        stages.append((stage, view, seconds))
+
+
+@contextmanager
+def timed(stage: str, view: str = ""):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start, view)
+
+
+def observe_analysis(view: str, result: dict):
+    # Этапы внутри воркера приходят в результате анализа (в миллисекундах),
+    # поэтому учёт работает и с процессным пулом
+    stages = result.get("preprocess") or result.get("frames") or {}
+    for stage in ("decode", "resize", "convert", "roi", "process"):
+        ms = stages.get(f"{stage}_ms")
+        if ms is not None:
+            observe(stage, ms / 1000, view)
+
+    complexity = stages.get("model_complexity")
+    if complexity is not None:
+        pose_tiers.inc(view, str(complexity))
+        pose_attempts.inc(view, amount=stages.get("attempts", 1))
+
+
+# =========================
+# PER-REQUEST BREAKDOWN
+# =========================
+@contextmanager
+def track_request():
+    stages = []
+    token = _request_stages.set(stages)
+    try:
+        yield stages
+    finally:
+        _request_stages.reset(token)
+
+
+def server_timing(stages: list) -> str:
+    # Одинаковые этапы двух ракурсов различаются суффиксом: decode-back
+    parts = []
+    for stage, view, seconds in stages:
+        name = f"{stage}-{view}" if view else stage
+        parts.append(f"{name};dur={seconds * 1000:.1f}")
+    return ", ".join(parts)
+
+
+# =========================
+# MULTI-PROCESS AGGREGATION
+# =========================
+def _flush():
+    # Атомарная замена: читатель видит либо старый, либо новый файл целиком
+    path = os.path.join(METRICS_DIR, f"{os.getpid()}.json")
+    snapshot = {m.name: [list(sample) for sample in m.samples()] for m in REGISTRY}
+    with open(f"{path}.tmp", "w") as f:
+        json.dump({"time": time.time(), "metrics": snapshot}, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def _snapshots() -> list:
+    _flush()
+    snapshots = []
+    for name in os.listdir(METRICS_DIR):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(METRICS_DIR, name)) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            # Файл удалён между listdir и open
+            continue
+    return snapshots
+
+
+def _merged(name: str, snapshots: list):
+    # Одинаковые ряды разных процессов складываются
+    totals = {}
+    for snapshot in snapshots:
+        for sample, labels, value in snapshot["metrics"].get(name, ()):
+            totals[sample, labels] = totals.get((sample, labels), 0) + value
+    for (sample, labels), value in totals.items():
+        yield sample, labels, round(value, 6) if isinstance(value, float) else value
+
+
+def start():
+    global _flusher
+
+    if not METRICS_DIR or _flusher is not None:
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    _stopping.clear()
+
+    def loop():
+        while not _stopping.wait(METRICS_FLUSH_INTERVAL):
+            try:
+                _flush()
+            except OSError:
+                logger.warning("Could not write metrics to %s", METRICS_DIR)
+
+    _flusher = threading.Thread(target=loop, name="metrics-flush", daemon=True)
+    _flusher.start()
+
+
+def stop():
+    global _flusher
+
+    if _flusher is None:
+        return
+    _stopping.set()
+    _flusher.join()
+    _flusher = None
+    # Итоговые значения остановленного воркера остаются в сумме счётчиков
+    _flush()
+
+
+# =========================
+# EXPOSITION
+# =========================
+def render() -> str:
+    if METRICS_DIR:
+        # Счётчики и гистограммы — по всем процессам с начала запуска
+        # сервера, включая завершённые (иначе сумма «сбрасывалась» бы);
+        # gauge — только по живым, чьи файлы обновлялись недавно
+        snapshots = _snapshots()
+        now = time.time()
+        live = [s for s in snapshots if now - s["time"] <= 3 * METRICS_FLUSH_INTERVAL]
+
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        if not METRICS_DIR:
+            samples = metric.samples()
+        else:
+            samples = _merged(
+                metric.name, live if metric.kind == "gauge" else snapshots
+            )
+        for name, labels, value in samples:
+            lines.append(f"{name}{labels} {value}")
+    return "\n".join(lines) + "\n"
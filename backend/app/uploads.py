@@ -0,0 +1,203 @@
+import os
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+from app.imaging import read_image_size, sniff_format
+from app.pipeline import AnalysisError
+
+# -------------------------
+# CONFIG
+# -------------------------
+
+# Максимальный размер одного фото (байты)
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+
+# Максимальный размер одного ролика / файла для /analyze/video (байты)
+VIDEO_MAX_BYTES = int(os.getenv("VIDEO_MAX_BYTES", str(100 * 1024 * 1024)))
+
+# Файлов на один ракурс в /analyze/video (серия фото) и их общий объём
+VIDEO_MAX_FILES = int(os.getenv("VIDEO_MAX_FILES", "60"))
+VIDEO_MAX_VIEW_BYTES = int(os.getenv("VIDEO_MAX_VIEW_BYTES", str(VIDEO_MAX_BYTES)))
+
+# Максимальное разрешение фото — проверяется по заголовку до декодирования
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(50_000_000)))
+
+# Файл читается частями; в первой части почти всегда есть и сигнатура,
+# и размеры (SOF в JPEG идёт после EXIF, а он не больше 64 КБ).
+# Если размеров в ней нет, они проверяются после чтения всего файла
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(256 * 1024)))
+
+# Весь запрос /analyze: два фото и поля формы
+ANALYZE_MAX_REQUEST_BYTES = 2 * UPLOAD_MAX_BYTES + 1024 * 1024
+
+# Весь запрос /analyze/video: оба ракурса и поля формы
+VIDEO_MAX_REQUEST_BYTES = 2 * VIDEO_MAX_VIEW_BYTES + 1024 * 1024
+
+# Весь запрос /analyze/batch. Starlette сохраняет multipart целиком до вызова
+# обработчика, поэтому предел по BATCH_MAX_ITEMS × 2 фото (десятки ГБ) не
+# годится — по умолчанию 1 ГБ
+BATCH_MAX_REQUEST_BYTES = int(
+    os.getenv("BATCH_MAX_REQUEST_BYTES", str(1024 * 1024 * 1024))
+)
+
+
+def _mb(size: int) -> str:
+    return f"{size / (1024 * 1024):.0f} МБ"
+
+
+def _check_image_header(data: bytes, label: str, complete: bool) -> bool:
+    # True — заголовок проверен; False — данных пока недостаточно
+    if len(data) < 8 and not complete:
+        return False
+
+    if sniff_format(data) is None:
+        raise AnalysisError(415, f"Фото {label}: файл не является JPEG или PNG")
+
+    size = read_image_size(data)
+    if size is None:
+        if not complete:
+            return False
+        raise AnalysisError(422, f"Фото {label}: не удалось прочитать размеры")
+
+    width, height = size
+    if width == 0 or height == 0:
+        raise AnalysisError(422, f"Фото {label}: пустое изображение")
+    if width * height > IMAGE_MAX_PIXELS:
+        raise AnalysisError(
+            413,
+            f"Фото {label}: разрешение {width}×{height} больше допустимого "
+            f"({IMAGE_MAX_PIXELS // 1_000_000} Мп)",
+        )
+    return True
+
+
+async def read_upload(
+    upload: UploadFile, label: str, limit: int = UPLOAD_MAX_BYTES, image: bool = True
+) -> bytes:
+    # Размер уже известен, если Starlette сохранил файл во временный
+    if upload.size is not None and upload.size > limit:
+        raise AnalysisError(413, f"Файл {label} больше {_mb(limit)}")
+
+    chunks = []
+    total = 0
+    checked = not image
+
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > limit:
+            raise AnalysisError(413, f"Файл {label} больше {_mb(limit)}")
+        chunks.append(chunk)
+
+        # Формат и размеры проверяются по первой части, до чтения остального
+        if not checked and len(chunks) == 1:
+            checked = _check_image_header(chunk, label, complete=False)
+
+    if not total:
+        raise AnalysisError(400, f"Файл {label} пуст")
+
+    data = chunks[0] if len(chunks) == 1 else b"".join(chunks)
+    if not checked:
+        _check_image_header(data, label, complete=True)
+    return data
+
+
+async def read_media(upload: UploadFile, label: str, limit: int = None) -> bytes:
+    # /analyze/video: фото из серии проверяются как фото, ролики — только по размеру
+    head = await upload.read(16)
+    await upload.seek(0)
+    if sniff_format(head):
+        photo_limit = (
+            UPLOAD_MAX_BYTES if limit is None else min(limit, UPLOAD_MAX_BYTES)
+        )
+        return await read_upload(upload, label, photo_limit)
+    video_limit = VIDEO_MAX_BYTES if limit is None else min(limit, VIDEO_MAX_BYTES)
+    return await read_upload(upload, label, video_limit, image=False)
+
+
+async def read_media_list(uploads: list, label: str) -> list:
+    # Все файлы одного ракурса: не больше VIDEO_MAX_FILES и VIDEO_MAX_VIEW_BYTES
+    if len(uploads) > VIDEO_MAX_FILES:
+        raise AnalysisError(
+            413, f"Не более {VIDEO_MAX_FILES} файлов на ракурс ({label})"
+        )
+
+    blobs = []
+    remaining = VIDEO_MAX_VIEW_BYTES
+    for upload in uploads:
+        if remaining <= 0:
+            raise AnalysisError(
+                413, f"Файлы {label} вместе больше {_mb(VIDEO_MAX_VIEW_BYTES)}"
+            )
+        data = await read_media(upload, label, remaining)
+        remaining -= len(data)
+        blobs.append(data)
+    return blobs
+
+
+# -------------------------
+# REQUEST SIZE LIMIT
+# -------------------------
+class RequestTooLarge(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=413, detail="Слишком большой запрос")
+
+
+class RequestSizeLimit:
+    # ASGI-middleware: предел тела запроса по пути. Заведомо большой запрос
+    # отклоняется по Content-Length до разбора multipart, а принятые байты
+    # считаются по мере чтения — так ограничены и chunked-запросы без
+    # Content-Length, и запросы с заниженным заголовком
+
+    def __init__(self, app, limits: dict):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > limit:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Разбор формы в FastAPI пропускает HTTPException как есть,
+                    # и обработчик исключений отвечает 413
+                    raise RequestTooLarge()
+            return message
+
+        async def tracked_send(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except RequestTooLarge:
+            if started:
+                raise
+            await self._reject(scope, receive, send)
+
+    @staticmethod
+    async def _reject(scope, receive, send):
+        error = RequestTooLarge()
+        response = JSONResponse(
+            status_code=error.status_code, content={"detail": error.detail}
+        )
+        await response(scope, receive, send)
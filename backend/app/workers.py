@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app import pose_engine
+
+logger = logging.getLogger(__name__)
+
+# -------------------------
+# CONFIG
+# -------------------------
+
+# "thread" — модели в пуле текущего процесса, "process" — отдельный пул в каждом воркере
+ANALYSIS_EXECUTOR = os.getenv("ANALYSIS_EXECUTOR", "thread")
+
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", str(os.cpu_count() or 1)))
+
+# Сколько задач может ждать свободного воркера сверх выполняющихся
+ANALYSIS_QUEUE_SIZE = int(os.getenv("ANALYSIS_QUEUE_SIZE", "16"))
+
+# Значение заголовка Retry-After (секунды) при переполнении очереди
+ANALYSIS_RETRY_AFTER = int(os.getenv("ANALYSIS_RETRY_AFTER", "5"))
+
+# Прогревать и модели режима трекинга (видео / серия кадров)
+WARMUP_TRACKING = os.getenv("WARMUP_TRACKING", "1") == "1"
+
+
+class QueueFull(RuntimeError):
+    pass
+
+
+class NotReady(RuntimeError):
+    pass
+
+
+_executor = None
+_pending = 0
+_rejected = 0
+_restarts = 0
+_lock = threading.Lock()
+
+
+def _init_worker():
+    # Импорт здесь: в spawn-воркере модуль analysis загружается заново
+    from app.analysis import POSE_VARIANTS
+
+    pose_engine.warmup(POSE_VARIANTS)
+    if WARMUP_TRACKING:
+        pose_engine.warmup(POSE_VARIANTS, static=False)
+
+
+def _ping():
+    return os.getpid()
+
+
+# =========================
+# LIFECYCLE
+# =========================
+def start():
+    global _executor
+
+    workers = max(1, ANALYSIS_WORKERS)
+
+    if ANALYSIS_EXECUTOR == "process":
+        # fork после инициализации MediaPipe небезопасен — только spawn
+        _executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+        # Поднимаем все процессы заранее, чтобы первый запрос не ждал spawn
+        for future in [_executor.submit(_ping) for _ in range(workers)]:
+            future.result()
+    elif ANALYSIS_EXECUTOR == "thread":
+        _init_worker()
+        _executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="analysis",
+        )
+    else:
+        raise RuntimeError(f"Unknown ANALYSIS_EXECUTOR: {ANALYSIS_EXECUTOR}")
+
+
+def shutdown():
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+    pose_engine.shutdown()
+
+
+def running() -> bool:
+    return _executor is not None
+
+
+def _restart(broken):
+    # Упавший процесс (OOM, сбой в MediaPipe) ломает весь ProcessPoolExecutor:
+    # дальше любой submit — BrokenProcessPool. Пул пересоздаётся в фоне, а до
+    # тех пор запросы получают 503, а /health — not ready
+    global _executor, _restarts
+
+    with _lock:
+        if _executor is not broken:
+            return
+        _executor = None
+        _restarts += 1
+
+    def rebuild():
+        broken.shutdown(wait=False, cancel_futures=True)
+        try:
+            start()
+        except Exception:
+            logger.exception("Analysis process pool restart failed")
+
+    logger.error("Analysis process pool is broken, restarting")
+    threading.Thread(target=rebuild, name="analysis-restart", daemon=True).start()
+
+
+# =========================
+# SUBMIT
+# =========================
+def capacity() -> int:
+    return max(1, ANALYSIS_WORKERS) + ANALYSIS_QUEUE_SIZE
+
+
+def _release(_future):
+    global _pending
+
+    with _lock:
+        _pending -= 1
+
+
+async def run(fn, *args):
+    global _pending, _rejected
+
+    if _executor is None:
+        # Модели ещё прогреваются (или сервис останавливается)
+        raise NotReady("Analysis executor is not started")
+
+    with _lock:
+        if _pending >= capacity():
+            _rejected += 1
+            raise QueueFull("Очередь анализа переполнена")
+        _pending += 1
+
+    # Слот освобождается, когда задача реально завершилась в воркере,
+    # даже если ожидающий её запрос уже отменён по таймауту
+    executor = _executor
+    try:
+        future = executor.submit(fn, *args)
+    except BaseException as e:
+        _release(None)
+        if isinstance(e, BrokenProcessPool):
+            _restart(executor)
+            raise NotReady("Analysis process pool is restarting") from e
+        raise
+    future.add_done_callback(_release)
+    try:
+        return await asyncio.wrap_future(future)
+    except BrokenProcessPool as e:
+        _restart(executor)
+        raise NotReady("Analysis process pool is restarting") from e
+
+
+def stats() -> dict:
+    with _lock:
+        return {
+            "executor": ANALYSIS_EXECUTOR,
+            "workers": max(1, ANALYSIS_WORKERS),
+            "capacity": capacity(),
+            "pending": _pending,
+            "rejected": _rejected,
+            "restarts": _restarts,
+        }
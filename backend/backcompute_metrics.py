@@ -0,0 +1,78 @@
+import argparse
+
+import numpy as np
+from sqlalchemy import select, update
+
+from app import landmarks, metrics
+from app.db import session_scope
+from app.models import Screening
+
+
+def _write(db, view: str, ids: list, values: dict):
+    # values: metric → массив (N,) в порядке ids
+    rows = db.execute(
+        select(Screening.id, Screening.metrics).where(Screening.id.in_(ids))
+    ).all()
+    stored = {row.id: row.metrics for row in rows}
+
+    params = []
+    for i, screening_id in enumerate(ids):
+        data = stored.get(screening_id)
+        if data is None:
+            continue
+        view_metrics = dict(data.get(view) or {})
+        for m, arr in values.items():
+            view_metrics[m.name] = round(float(arr[i]), m.digits)
+        params.append({"id": screening_id, "metrics": {**data, view: view_metrics}})
+
+    if params:
+        db.execute(update(Screening), params)
+    return len(params)
+
+
+def backcompute(view: str, names: list) -> int:
+    selected = [m for m in metrics.REGISTRY[view] if not names or m.name in names]
+    if not selected:
+        raise SystemExit(f"No metrics to compute for view {view!r}")
+
+    updated = 0
+    with session_scope() as db:
+        # Одно фото: вся пачка считается сразу на массиве (N, 33, 4)
+        for ids, aspect, lm in landmarks.iter_chunks(db, view):
+            lm = lm.astype(np.float32, copy=False)
+            values = {m: m.fn(lm, aspect) for m in selected}
+            updated += _write(db, view, ids, values)
+            db.commit()
+
+        # Видео / серия: метрика по всем кадрам, затем медиана, как в analysis
+        for part in landmarks.iter_series(db, view):
+            values = {
+                m: np.array(
+                    [
+                        np.median(m.fn(lm.astype(np.float32, copy=False), a))
+                        for _, a, lm in part
+                    ]
+                )
+                for m in selected
+            }
+            updated += _write(db, view, [p[0] for p in part], values)
+            db.commit()
+    return updated
+
+
+def backcompute_metrics():
+    parser = argparse.ArgumentParser(
+        description="Пересчёт метрик по сохранённым landmarks без повторного инференса"
+    )
+    parser.add_argument("view", choices=sorted(metrics.REGISTRY))
+    parser.add_argument(
+        "metrics", nargs="*", help="имена метрик (по умолчанию все для ракурса)"
+    )
+    args = parser.parse_args()
+
+    updated = backcompute(args.view, args.metrics)
+    print(f"✅ Metrics recomputed for {updated} screenings ({args.view})")
+
+
+if __name__ == "__main__":
+    backcompute_metrics()
@@ -0,0 +1,12 @@
+from app.db import session_scope
+from app.stats import backfill
+
+
+def backfill_stats():
+    with session_scope() as db:
+        rows = backfill(db)
+    print(f"✅ Risk statistics rebuilt ({rows} rollup rows)")
+
+
+if __name__ == "__main__":
+    backfill_stats()
@@ -0,0 +1,362 @@
+"""Benchmark suite for the analysis pipeline.
+
+Measures model-init cost, _decode_image, analyze_back_photo,
+analyze_side_photo (fixed models and the complexity cascade, whole
+frame and person ROI) and the full /analyze request (FastAPI TestClient
++ SQLite stand-in) on the bundled sample_images and upscaled variants.
+Results are written as JSON; pass --baseline to flag regressions.
+
+Run from backend/:
+
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --quick --baseline benchmarks/results/old.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+SAMPLE_DIR = Path(__file__).resolve().parents[2] / "sample_images"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Отдельная БД и выключенный кэш результатов — до импорта app.*
+_tmpdir = tempfile.mkdtemp(prefix="spine-bench-")
+os.environ["DATABASE_URL"] = os.getenv(
+    "BENCH_DATABASE_URL", f"sqlite:///{_tmpdir}/bench.sqlite"
+)
+os.environ["RESULT_CACHE_SIZE"] = "0"
+os.environ["STARTUP_WARMUP"] = "blocking"
+
+_import_start = time.perf_counter()
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+
+from app import analysis, pose_engine  # noqa: E402
+
+IMPORT_SECONDS = time.perf_counter() - _import_start
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss в Linux — килобайты
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def summarize(samples: list) -> dict:
+    ordered = sorted(samples)
+    p95_index = max(0, int(round(0.95 * len(ordered))) - 1)
+    return {
+        "n": len(ordered),
+        "p50_ms": round(statistics.median(ordered) * 1000, 2),
+        "p95_ms": round(ordered[p95_index] * 1000, 2),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 2),
+    }
+
+
+def measure(fn, reps: int) -> dict:
+    # Первый вызов прогревает кэши OpenCV/TFLite и в статистику не входит
+    fn()
+    samples = []
+    for _ in range(reps):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+# =========================
+# INPUTS
+# =========================
+def build_inputs(megapixels: list) -> dict:
+    back_path, side_path = sorted(SAMPLE_DIR.glob("*.png"))[:2]
+    inputs = {"sample": (back_path.read_bytes(), side_path.read_bytes())}
+
+    for mp in megapixels:
+        pair = []
+        for path in (back_path, side_path):
+            img = cv2.imdecode(np.fromfile(path, np.uint8), cv2.IMREAD_COLOR)
+            height, width = img.shape[:2]
+            scale = (mp * 1e6 / (width * height)) ** 0.5
+            big = cv2.resize(
+                img,
+                (round(width * scale), round(height * scale)),
+                interpolation=cv2.INTER_LINEAR,
+            )
+            pair.append(cv2.imencode(".jpg", big, [cv2.IMWRITE_JPEG_QUALITY, 90])[1])
+            del img, big
+        inputs[f"{mp}mp"] = tuple(buf.tobytes() for buf in pair)
+    return inputs
+
+
+def build_room(megapixels: int = 12) -> tuple:
+    # Общий снимок класса: образец занимает малую часть большого кадра
+    pair = []
+    for path in sorted(SAMPLE_DIR.glob("*.png"))[:2]:
+        img = cv2.imdecode(np.fromfile(path, np.uint8), cv2.IMREAD_COLOR)
+        height, width = img.shape[:2]
+        room_w = round((megapixels * 1e6 * 4 / 3) ** 0.5)
+        room_h = room_w * 3 // 4
+        scale = room_h * 0.4 / height
+        person = cv2.resize(img, (round(width * scale), round(height * scale)))
+        canvas = np.full((room_h, room_w, 3), (200, 190, 180), dtype=np.uint8)
+        top, left = room_h // 2, room_w * 2 // 3
+        canvas[top : top + person.shape[0], left : left + person.shape[1]] = person
+        pair.append(
+            cv2.imencode(".jpg", canvas, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+        )
+    return tuple(pair)
+
+
+# =========================
+# SECTIONS
+# =========================
+def bench_model_init() -> dict:
+    results = {}
+    for complexity, confidence in analysis.POSE_VARIANTS:
+        pool = pose_engine.PosePool(complexity, confidence, size=1)
+        start = time.perf_counter()
+        pool.warmup()
+        results[f"complexity_{complexity}"] = round(
+            (time.perf_counter() - start) * 1000, 1
+        )
+        pool.close()
+    return results
+
+
+def bench_functions(inputs: dict, reps: int) -> dict:
+    pose_engine.warmup(analysis.POSE_VARIANTS)
+    results = {}
+    for name, (back, side) in inputs.items():
+        results[name] = {
+            "bytes": [len(back), len(side)],
+            "decode_image": measure(lambda: analysis._decode_image(back), reps),
+            "analyze_back_photo": measure(
+                lambda: analysis.analyze_back_photo(back), reps
+            ),
+            "analyze_side_photo": measure(
+                lambda: analysis.analyze_side_photo(side), reps
+            ),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        print(f"  {name}: {results[name]['analyze_back_photo']}", flush=True)
+    return results
+
+
+def bench_cascade(inputs: dict, reps: int) -> dict:
+    # Фиксированные модели против каскада на тех же фото: задержка,
+    # доля каждой ступени и число фото без найденной позы
+    for confidence in (analysis.BACK_MIN_CONFIDENCE, analysis.SIDE_MIN_CONFIDENCE):
+        pose_engine.warmup([(c, confidence) for c in analysis.POSE_CASCADE_TIERS])
+
+    enabled = analysis.POSE_CASCADE
+    results = {}
+    try:
+        for mode in ("fixed", "cascade"):
+            analysis.POSE_CASCADE = mode == "cascade"
+            latency, tiers, failures = {}, {}, 0
+
+            def run(fn, data, view):
+                nonlocal failures
+                try:
+                    result = fn(data)
+                except analysis.PoseNotFound:
+                    failures += 1
+                    return
+                key = f"{view}:{result['preprocess']['model_complexity']}"
+                tiers[key] = tiers.get(key, 0) + 1
+
+            for name, (back, side) in inputs.items():
+                latency[name] = {
+                    "back": measure(
+                        lambda: run(analysis.analyze_back_photo, back, "back"), reps
+                    ),
+                    "side": measure(
+                        lambda: run(analysis.analyze_side_photo, side, "side"), reps
+                    ),
+                }
+            results[mode] = {
+                "latency": latency,
+                "tiers": tiers,
+                "pose_failures": failures,
+            }
+            print(f"  {mode}: tiers={tiers} failures={failures}", flush=True)
+    finally:
+        analysis.POSE_CASCADE = enabled
+    return results
+
+
+def bench_roi(reps: int) -> dict:
+    # Фото целиком против выреза вокруг человека на общем снимке
+    back, side = build_room()
+    enabled = analysis.POSE_ROI
+    results = {}
+    try:
+        for mode in ("whole", "roi"):
+            analysis.POSE_ROI = mode == "roi"
+            results[mode] = {
+                "back": measure(lambda: analysis.analyze_back_photo(back), reps),
+                "side": measure(lambda: analysis.analyze_side_photo(side), reps),
+                "metrics": {
+                    "back": analysis.analyze_back_photo(back)["shoulder_angle"],
+                    "side": analysis.analyze_side_photo(side)["forward_head"],
+                },
+            }
+            print(f"  {mode}: {results[mode]}", flush=True)
+    finally:
+        analysis.POSE_ROI = enabled
+    return results
+
+
+def bench_endpoint(inputs: dict, reps: int, concurrency: list) -> dict:
+    from fastapi.testclient import TestClient
+
+    from app.db import Base, engine
+    from app.main import app
+
+    Base.metadata.create_all(engine)
+
+    results = {}
+    with TestClient(app) as client:
+        user_id = client.post("/auth/anonymous", json={"email": "bench@local"}).json()[
+            "user_id"
+        ]
+
+        def call(back, side):
+            start = time.perf_counter()
+            res = client.post(
+                "/analyze",
+                params={"user_id": user_id},
+                files={
+                    "back_photo": ("back.jpg", back, "image/jpeg"),
+                    "side_photo": ("side.jpg", side, "image/jpeg"),
+                },
+            )
+            res.raise_for_status()
+            return time.perf_counter() - start
+
+        for name, (back, side) in inputs.items():
+            latency = summarize([call(back, side) for _ in range(reps)])
+
+            throughput = {}
+            for level in concurrency:
+                total = max(reps, level * 2)
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=level) as executor:
+                    list(executor.map(lambda _: call(back, side), range(total)))
+                throughput[str(level)] = round(total / (time.perf_counter() - start), 2)
+
+            results[name] = {
+                "latency": latency,
+                "throughput_rps": throughput,
+                "peak_rss_mb": peak_rss_mb(),
+            }
+            print(f"  {name}: {latency} rps={throughput}", flush=True)
+    return results
+
+
+# =========================
+# REGRESSION CHECK
+# =========================
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+
+    def walk(cur, base, path):
+        for key, value in cur.items():
+            if key not in base:
+                continue
+            if isinstance(value, dict):
+                walk(value, base[key], f"{path}.{key}")
+            elif key == "p50_ms" and base[key]:
+                ratio = value / base[key]
+                if ratio > 1 + tolerance:
+                    regressions.append(
+                        f"{path}: {base[key]} → {value} ms (x{ratio:.2f})"
+                    )
+
+    walk(current.get("sections", {}), baseline.get("sections", {}), "sections")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quick", action="store_true", help="fewer sizes and reps")
+    parser.add_argument("--reps", type=int, default=10)
+    parser.add_argument("--megapixels", type=int, nargs="*", default=[1, 4, 12, 48])
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[1, 2, 4, 8])
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.quick:
+        args.reps = min(args.reps, 3)
+        args.megapixels = [mp for mp in args.megapixels if mp <= 4]
+        args.concurrency = [c for c in args.concurrency if c <= 2]
+
+    print("Building inputs...", flush=True)
+    inputs = build_inputs(args.megapixels)
+
+    sections = {"import_ms": round(IMPORT_SECONDS * 1000, 1)}
+    print("Model init...", flush=True)
+    sections["model_init_ms"] = bench_model_init()
+    print("Analysis functions...", flush=True)
+    sections["functions"] = bench_functions(inputs, args.reps)
+    print("Complexity cascade...", flush=True)
+    sections["cascade"] = bench_cascade(inputs, args.reps)
+    print("Person ROI on a full-room shot...", flush=True)
+    sections["roi"] = bench_roi(args.reps)
+    print("/analyze endpoint...", flush=True)
+    sections["endpoint"] = bench_endpoint(inputs, args.reps, args.concurrency)
+
+    from app.main import app
+
+    report = {
+        "created_at": datetime.utcnow().isoformat(),
+        "app_version": app.version,
+        "analysis_version": analysis.ANALYSIS_VERSION,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "database": os.environ["DATABASE_URL"].split(":", 1)[0],
+        },
+        "params": {
+            "reps": args.reps,
+            "megapixels": args.megapixels,
+            "concurrency": args.concurrency,
+        },
+        "peak_rss_mb": peak_rss_mb(),
+        "sections": sections,
+    }
+
+    output = args.output or RESULTS_DIR / (
+        f"bench_{app.version}_{datetime.utcnow():%Y%m%dT%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        regressions = compare(
+            report, json.loads(args.baseline.read_text()), args.tolerance
+        )
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
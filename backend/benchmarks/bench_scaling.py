@@ -0,0 +1,206 @@
+"""Throughput scaling of the multi-worker server.
+
+For each worker count, starts `python -m app.serve` in a fresh subprocess,
+waits until every worker has warmed its models (each one answers /health
+with its own pid), then drives /analyze with concurrent clients for a fixed
+duration. Reports throughput, latency percentiles and scaling efficiency
+relative to a single worker. The result cache is disabled so that every
+request runs the models; --cache keeps it on and reports how many hits
+were served from the store shared between workers.
+
+Run from backend/:
+
+    python -m benchmarks.bench_scaling --workers 1 2 4 --duration 30
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+from benchmarks.bench_startup import BACKEND_DIR, SAMPLE_DIR, free_port, prepare_env
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def health(base: str) -> httpx.Response:
+    # Новое соединение на каждый запрос: keep-alive держит клиента у одного
+    # воркера, а нужно увидеть все
+    return httpx.get(f"{base}/health", timeout=30)
+
+
+def wait_ready(base: str, workers: int, timeout: float) -> set:
+    # Готовый воркер отвечает 200 со своим pid; ждём, пока ответят все
+    start = time.perf_counter()
+    pids = set()
+    while len(pids) < workers:
+        if time.perf_counter() - start > timeout:
+            raise TimeoutError(f"{len(pids)}/{workers} workers ready after {timeout} s")
+        try:
+            res = health(base)
+        except httpx.TransportError:
+            time.sleep(0.1)
+            continue
+        if res.status_code == 200:
+            pids.add(res.json()["startup"]["pid"])
+        else:
+            time.sleep(0.1)
+    return pids
+
+
+def load(base: str, concurrency: int, duration: float) -> dict:
+    back, side = sorted(SAMPLE_DIR.glob("*.png"))[:2]
+    files = {
+        "back_photo": (back.name, back.read_bytes(), "image/png"),
+        "side_photo": (side.name, side.read_bytes(), "image/png"),
+    }
+
+    with httpx.Client(base_url=base, timeout=120) as client:
+        user_id = client.post("/auth/anonymous", json={"email": "scale@local"}).json()[
+            "user_id"
+        ]
+
+    latencies, errors = [], []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client_loop():
+        # Отдельный клиент на поток: своё keep-alive соединение
+        with httpx.Client(base_url=base, timeout=120) as client:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                res = client.post("/analyze", params={"user_id": user_id}, files=files)
+                elapsed = time.perf_counter() - start
+                with lock:
+                    if res.status_code == 200:
+                        latencies.append(elapsed)
+                    else:
+                        errors.append(res.status_code)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client_loop) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    ordered = sorted(latencies)
+    p95_index = max(0, int(round(0.95 * len(ordered))) - 1)
+    return {
+        "requests": len(ordered),
+        "errors": len(errors),
+        "throughput_rps": round(len(ordered) / wall, 2),
+        "p50_ms": round(statistics.median(ordered) * 1000, 1) if ordered else None,
+        "p95_ms": round(ordered[p95_index] * 1000, 1) if ordered else None,
+    }
+
+
+def cache_hits(base: str, workers: int, polls: int = 200) -> dict:
+    # /health отвечает случайный воркер — опрашиваем, пока не увидим всех
+    seen = {}
+    for _ in range(polls):
+        res = health(base).json()
+        seen[res["startup"]["pid"]] = res["cache"]
+        if len(seen) >= workers:
+            break
+    return {
+        "memory_hits": sum(c["hits"] for c in seen.values()),
+        "shared_store_hits": sum(c["disk_hits"] for c in seen.values()),
+        "misses": sum(c["misses"] for c in seen.values()),
+    }
+
+
+def run(env: dict, workers: int, args) -> dict:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(env, PORT=str(port), WEB_CONCURRENCY=str(workers))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.serve"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        start = time.perf_counter()
+        pids = wait_ready(base, workers, args.timeout)
+        ready_s = round(time.perf_counter() - start, 2)
+
+        result = load(base, args.concurrency or 2 * workers, args.duration)
+        result["ready_s"] = ready_s
+        result["pids"] = len(pids)
+        if args.cache:
+            result["cache"] = cache_hits(base, workers)
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument(
+        "--concurrency", type=int, help="client threads (default: 2 per worker)"
+    )
+    parser.add_argument("--cache", action="store_true", help="keep the result cache")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="spine-scaling-")
+    env = prepare_env(workdir)
+    if args.cache:
+        env.pop("RESULT_CACHE_SIZE")
+        env["RESULT_CACHE_PATH"] = f"{workdir}/results.sqlite"
+
+    results = {}
+    for workers in args.workers:
+        print(f"{workers} worker(s)...", flush=True)
+        results[str(workers)] = run(env, workers, args)
+        print(f"  {results[str(workers)]}", flush=True)
+
+    # Эффективность: rps на N воркерах / (N × rps на одном)
+    single = results.get("1", {}).get("throughput_rps")
+    if single:
+        for workers, result in results.items():
+            result["scaling_efficiency"] = round(
+                result["throughput_rps"] / (int(workers) * single), 2
+            )
+
+    report = {
+        "created_at": datetime.utcnow().isoformat(),
+        "environment": {
+            "python": sys.version.split()[0],
+            "cpu_count": os.cpu_count(),
+            "database": env["DATABASE_URL"].split(":", 1)[0],
+        },
+        "params": {
+            "duration_s": args.duration,
+            "concurrency": args.concurrency or "2 per worker",
+            "cache": args.cache,
+        },
+        "workers": results,
+    }
+
+    output = args.output or RESULTS_DIR / (
+        f"scaling_{datetime.utcnow():%Y%m%dT%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""Cold-start benchmark for the API process.
+
+Starts uvicorn in a fresh subprocess several times and records time to
+first response, time until /health reports ready, the first /analyze
+latency and the peak RSS of the server. A separate `python -X importtime`
+run lists the slowest imports of app.main. Results are written as JSON;
+pass --baseline to flag regressions.
+
+Run from backend/:
+
+    python -m benchmarks.bench_startup --runs 3
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+SAMPLE_DIR = BACKEND_DIR.parent / "sample_images"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def peak_rss_mb(pid: int) -> float:
+    # VmHWM — пиковый RSS процесса (только Linux)
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return 0.0
+
+
+def prepare_env(workdir: str) -> dict:
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{workdir}/startup.sqlite")
+    env["RESULT_CACHE_SIZE"] = "0"
+    env["PYTHONPATH"] = str(BACKEND_DIR)
+
+    # Таблицы нужны очереди задач, которая стартует после прогрева
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "from app.db import Base, engine; import app.models; "
+            "Base.metadata.create_all(engine)",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+        check=True,
+    )
+    return env
+
+
+# =========================
+# IMPORT TIME
+# =========================
+def bench_imports(env: dict, top: int) -> dict:
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall_ms = round((time.perf_counter() - start) * 1000, 1)
+
+    # import time: self [us] | cumulative | imported package
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        modules.append((name.strip(), int(cumulative) / 1000))
+
+    modules.sort(key=lambda item: item[1], reverse=True)
+    return {
+        "wall_ms": wall_ms,
+        "slowest_ms": {name: round(ms, 1) for name, ms in modules[:top]},
+    }
+
+
+# =========================
+# COLD START
+# =========================
+def cold_start(env: dict, timeout: float) -> dict:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+
+    result = {}
+    try:
+        with httpx.Client(base_url=base, timeout=120) as client:
+            while "ready_s" not in result:
+                if time.perf_counter() - start > timeout:
+                    raise TimeoutError(f"Server not ready after {timeout} s")
+                try:
+                    res = client.get("/health")
+                except httpx.TransportError:
+                    time.sleep(0.05)
+                    continue
+                result.setdefault("first_response_s", time.perf_counter() - start)
+                if res.status_code == 200:
+                    result["ready_s"] = time.perf_counter() - start
+                    result["startup"] = res.json()["startup"]
+                else:
+                    time.sleep(0.05)
+
+            back, side = sorted(SAMPLE_DIR.glob("*.png"))[:2]
+            user_id = client.post(
+                "/auth/anonymous", json={"email": "startup@local"}
+            ).json()["user_id"]
+            first = time.perf_counter()
+            client.post(
+                "/analyze",
+                params={"user_id": user_id},
+                files={
+                    "back_photo": (back.name, back.read_bytes(), "image/png"),
+                    "side_photo": (side.name, side.read_bytes(), "image/png"),
+                },
+            ).raise_for_status()
+            result["first_analyze_s"] = time.perf_counter() - first
+            result["peak_rss_mb"] = peak_rss_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return result
+
+
+def summarize(runs: list, key: str) -> dict:
+    values = sorted(run[key] for run in runs)
+    return {
+        "p50_ms": round(statistics.median(values) * 1000, 1),
+        "max_ms": round(values[-1] * 1000, 1),
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for name, values in current["sections"]["cold_start"].items():
+        base = baseline.get("sections", {}).get("cold_start", {}).get(name)
+        if isinstance(values, dict) and base and base.get("p50_ms"):
+            ratio = values["p50_ms"] / base["p50_ms"]
+            if ratio > 1 + tolerance:
+                regressions.append(
+                    f"{name}: {base['p50_ms']} → {values['p50_ms']} ms (x{ratio:.2f})"
+                )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to keep")
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="spine-startup-")
+    env = prepare_env(workdir)
+
+    print("Import time...", flush=True)
+    imports = bench_imports(env, args.top)
+    print(f"  import app.main: {imports['wall_ms']} ms", flush=True)
+
+    runs = []
+    for i in range(args.runs):
+        run = cold_start(env, args.timeout)
+        runs.append(run)
+        print(
+            f"  run {i + 1}: ready {run['ready_s']:.2f} s, "
+            f"first /analyze {run['first_analyze_s'] * 1000:.0f} ms",
+            flush=True,
+        )
+
+    report = {
+        "created_at": datetime.utcnow().isoformat(),
+        "environment": {
+            "python": sys.version.split()[0],
+            "cpu_count": os.cpu_count(),
+            "warmup": env.get("STARTUP_WARMUP", "background"),
+            "executor": env.get("ANALYSIS_EXECUTOR", "thread"),
+        },
+        "sections": {
+            "imports": imports,
+            "cold_start": {
+                "first_response": summarize(runs, "first_response_s"),
+                "ready": summarize(runs, "ready_s"),
+                "first_analyze": summarize(runs, "first_analyze_s"),
+                "peak_rss_mb": max(run["peak_rss_mb"] for run in runs),
+            },
+            "startup_report": runs[-1]["startup"],
+        },
+    }
+
+    output = args.output or RESULTS_DIR / (
+        f"startup_{datetime.utcnow():%Y%m%dT%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        regressions = compare(
+            report, json.loads(args.baseline.read_text()), args.tolerance
+        )
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""Stress check: concurrent back-view analyses must match serial runs.
+
+Run from backend/:
+
+    python -m benchmarks.stress_back_view --threads 16 --rounds 64
+"""
+
+import argparse
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app import metrics, pose_engine
+from app.analysis import POSE_VARIANTS, analyze_back_photo
+
+SAMPLE_DIR = Path(__file__).resolve().parents[2] / "sample_images"
+
+# Сравниваются только метрики и пояснения: preprocess содержит время этапов
+FIELDS = [m.name for m in metrics.REGISTRY["back"]] + ["explanation"]
+
+
+def analyze(image: bytes) -> dict:
+    result = analyze_back_photo(image)
+    return {name: result[name] for name in FIELDS}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=64)
+    args = parser.parse_args()
+
+    images = [p.read_bytes() for p in sorted(SAMPLE_DIR.glob("*.png"))]
+    if not images:
+        print(f"No sample images in {SAMPLE_DIR}")
+        return 1
+
+    pose_engine.warmup(POSE_VARIANTS)
+
+    expected = [analyze(img) for img in images]
+
+    jobs = [i % len(images) for i in range(args.rounds)]
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        results = list(executor.map(lambda i: analyze(images[i]), jobs))
+
+    mismatches = [
+        (i, expected[i], result)
+        for i, result in zip(jobs, results)
+        if result != expected[i]
+    ]
+
+    for i, want, got in mismatches[:10]:
+        print(f"image #{i}: expected {want}, got {got}")
+
+    print(
+        f"{args.rounds} analyses on {args.threads} threads, "
+        f"{len(mismatches)} mismatches"
+    )
+    print(pose_engine.stats())
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
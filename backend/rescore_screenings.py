@@ -0,0 +1,29 @@
+import argparse
+
+from app.db import session_scope
+from app.rescore import RESCORE_CHUNK_SIZE, rescore
+
+
+def rescore_screenings():
+    parser = argparse.ArgumentParser(
+        description="Пересчёт уровней риска сохранённых обследований"
+    )
+    parser.add_argument(
+        "--ruleset", help="версия набора правил (по умолчанию RISK_RULESET)"
+    )
+    parser.add_argument("--chunk-size", type=int, default=RESCORE_CHUNK_SIZE)
+    parser.add_argument(
+        "--force", action="store_true", help="пересчитать и записи с этой же версией"
+    )
+    args = parser.parse_args()
+
+    with session_scope() as db:
+        totals = rescore(db, args.ruleset, args.chunk_size, args.force)
+    print(
+        f"✅ Ruleset {totals['ruleset_version']}: {totals['rescored']} screenings "
+        f"rescored, {totals['changed']} changed level, {totals['skipped']} skipped"
+    )
+
+
+if __name__ == "__main__":
+    rescore_screenings()
@@ -1,12 +1,90 @@
+import io
 import requests
 import streamlit as st
 import os
+from PIL import Image, ImageOps
+from requests.adapters import HTTPAdapter
 
 # ==================================
 # CONFIG
 # ==================================
 BACKEND_URL = os.getenv("BACKEND_URL", st.secrets["BACKEND_URL"])
 
+# Длинная сторона фото перед отправкой — как ANALYSIS_MAX_SIDE на бэкенде:
+# больше сервер всё равно не использует. Исключение — бэкенд с POSE_ROI=1:
+# вырез вокруг ребёнка берётся из фото до POSE_ROI_SOURCE_SIDE, а из 1024 px
+# вырезать нечего. Тогда POSE_ROI=1 задаётся и здесь
+POSE_ROI = os.getenv("POSE_ROI", "0") == "1"
+UPLOAD_MAX_SIDE = int(os.getenv("UPLOAD_MAX_SIDE", "4096" if POSE_ROI else "1024"))
+UPLOAD_JPEG_QUALITY = 90
+
+# Сколько секунд история показывается из кэша
+HISTORY_CACHE_TTL = 300
+
+
+# ==================================
+# HTTP SESSION
+# ==================================
+@st.cache_resource
+def get_session() -> requests.Session:
+    # Одна сессия на процесс Streamlit: TLS-соединение с бэкендом
+    # переиспользуется между запросами и перезапусками скрипта
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=10)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# ==================================
+# IMAGE COMPRESSION
+# ==================================
+@st.cache_data(max_entries=16, show_spinner=False)
+def compress_photo(data: bytes) -> tuple:
+    # Уменьшает фото до UPLOAD_MAX_SIDE и пережимает в JPEG.
+    # Возвращает (байты, MIME-тип)
+    image = Image.open(io.BytesIO(data))
+
+    if max(image.size) <= UPLOAD_MAX_SIDE and image.format in ("JPEG", "PNG"):
+        # Уже маленькое — отправляем как есть, без потерь от пережатия
+        return data, Image.MIME[image.format]
+
+    # Поворот из EXIF применяется к пикселям: после пережатия EXIF не сохраняется
+    image = ImageOps.exif_transpose(image).convert("RGB")
+    image.thumbnail((UPLOAD_MAX_SIDE, UPLOAD_MAX_SIDE), Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=UPLOAD_JPEG_QUALITY, optimize=True)
+    return buffer.getvalue(), "image/jpeg"
+
+
+def photo_file(uploaded) -> tuple:
+    data, mime = compress_photo(uploaded.getvalue())
+    name = uploaded.name if mime == uploaded.type else f"{uploaded.name}.jpg"
+    return name, data, mime
+
+
+# ==================================
+# HISTORY (CACHED)
+# ==================================
+@st.cache_data(ttl=HISTORY_CACHE_TTL, show_spinner=False)
+def load_history(user_id: str) -> list:
+    # Ошибки не кэшируются — следующий перезапуск спросит сервер снова.
+    # Сервер отдаёт историю страницами: идём по X-Next-Cursor до конца
+    history = []
+    params = {"limit": 500}
+    while True:
+        res = get_session().get(
+            f"{BACKEND_URL}/history/{user_id}", params=params, timeout=30
+        )
+        res.raise_for_status()
+        history.extend(res.json())
+        cursor = res.headers.get("X-Next-Cursor")
+        if not cursor:
+            return history
+        params["after"] = cursor
+
+
 st.set_page_config(
     page_title="Проверка формы позвоночника",
     layout="centered",
@@ -58,7 +136,7 @@ if not st.session_state.logged_in:
             st.warning("Введите email")
         else:
             try:
-                res = requests.post(
+                res = get_session().post(
                     f"{BACKEND_URL}/auth/anonymous",
                     json={"email": email},
                     timeout=30,
@@ -96,7 +174,7 @@ st.markdown(
 - 📷 вид **со спины**
 - 📷 вид **сбоку**
 
-Максимальный размер файла — **200 МБ**
+Максимальный размер файла — **20 МБ**
 """
 )
 
@@ -124,22 +202,14 @@ if st.button("Анализировать"):
     elif not back_photo or not side_photo:
         st.error("Необходимо загрузить оба фото: со спины и сбоку")
     else:
-        files = {
-            "back_photo": (
-                back_photo.name,
-                back_photo.getvalue(),
-                back_photo.type,
-            ),
-            "side_photo": (
-                side_photo.name,
-                side_photo.getvalue(),
-                side_photo.type,
-            ),
-        }
-
         try:
             with st.spinner("Анализ выполняется..."):
-                res = requests.post(
+                # Фото уменьшаются до размера, который использует сервер
+                files = {
+                    "back_photo": photo_file(back_photo),
+                    "side_photo": photo_file(side_photo),
+                }
+                res = get_session().post(
                     f"{BACKEND_URL}/analyze",
                     params={"user_id": st.session_state.user_id},
                     files=files,
@@ -152,6 +222,9 @@ if st.button("Анализировать"):
             else:
                 data = res.json()
 
+                # Новая запись должна сразу появиться в истории
+                load_history.clear()
+
                 st.subheader("📊 Результаты оценки")
 
                 st.write(
@@ -183,26 +256,22 @@ st.markdown("---")
 st.subheader("📚 История проверок")
 
 try:
-    res = requests.get(
-        f"{BACKEND_URL}/history/{st.session_state.user_id}",
-        timeout=30,
-    )
+    history = load_history(st.session_state.user_id)
 
-    if res.status_code == 200:
-        history = res.json()
-        if not history:
-            st.info("История пока пуста")
-        else:
-            for h in history:
-                st.markdown(
-                    f"""
-                    **Дата:** {h["date"]}  
-                    **Суммарный риск деформации позвоночника:** {translate_risk(h["overall_risk"])}  
-                    ---
-                    """
-                )
+    if not history:
+        st.info("История пока пуста")
     else:
-        st.warning("Не удалось загрузить историю")
+        for h in history:
+            st.markdown(
+                f"""
+                **Дата:** {h["date"]}  
+                **Суммарный риск деформации позвоночника:** {translate_risk(h["overall_risk"])}  
+                ---
+                """
+            )
+
+except requests.HTTPError:
+    st.warning("Не удалось загрузить историю")
 
 except Exception:
     st.warning("Сервер недоступен")